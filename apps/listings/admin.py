@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Listing, ListingImage, Location, Application, ListingLike
+from .models import Listing, ListingImage, Location, Application, ListingLike, DailyStats
+from . import export, response_cache, search
 
 
 @admin.register(Location)
@@ -11,7 +12,7 @@ class LocationAdmin(admin.ModelAdmin):
 class ListingImageInline(admin.TabularInline):
     model = ListingImage
     extra = 1
-    readonly_fields = ['image']
+    readonly_fields = ['image', 'status', 'processing_error']
 
 
 class ListingLikeInline(admin.TabularInline):
@@ -23,19 +24,38 @@ class ListingLikeInline(admin.TabularInline):
 
 @admin.register(Listing)
 class ListingAdmin(admin.ModelAdmin):
-    list_display = ('title', 'owner', 'deal_type', 'price', 'is_active', 'created_at')
+    list_display = ('title', 'owner', 'deal_type', 'price', 'likes_count', 'is_active', 'created_at')
     list_filter = ('deal_type', 'is_active', 'location__city')
     search_fields = ('title', 'description', 'address')
     inlines = [ListingImageInline, ListingLikeInline]
-    actions = ['mark_active', 'mark_inactive']
+    actions = ['mark_active', 'mark_inactive', 'export_csv', 'export_ndjson']
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Лайки могли удалить в инлайне — счётчик пересчитываем по таблице
+        Listing.objects.filter(pk=form.instance.pk).sync_likes_count()
 
     @admin.action(description='Опубликовать выбранные объявления')
     def mark_active(self, request, queryset):
-        queryset.update(is_active=True)
+        queryset.touch(is_active=True)
+        search.reindex(queryset)
+        response_cache.invalidate('listings')
 
     @admin.action(description='Снять с публикации')
     def mark_inactive(self, request, queryset):
-        queryset.update(is_active=False)
+        deactivated = queryset.filter(is_active=True).touch(is_active=False)
+        if deactivated:
+            DailyStats.bump(listings_deactivated=deactivated)
+        search.reindex(queryset)
+        response_cache.invalidate('listings')
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        return export.export_listings(queryset, 'csv')
+
+    @admin.action(description='Выгрузить в NDJSON')
+    def export_ndjson(self, request, queryset):
+        return export.export_listings(queryset, 'ndjson')
 
 
 @admin.register(Application)
@@ -44,6 +64,15 @@ class ApplicationAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'listing__title', 'contact_phone')
     list_filter = ('created_at',)
     readonly_fields = ('message',)
+    actions = ['export_csv', 'export_ndjson']
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        return export.export_applications(queryset, 'csv')
+
+    @admin.action(description='Выгрузить в NDJSON')
+    def export_ndjson(self, request, queryset):
+        return export.export_applications(queryset, 'ndjson')
 
 
 @admin.register(ListingLike)
@@ -52,3 +81,22 @@ class ListingLikeAdmin(admin.ModelAdmin):
     search_fields = ('listing__title', 'ip_address')
     list_filter = ('created_at',)
     autocomplete_fields = ['listing']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Listing.objects.filter(pk=obj.listing_id).sync_likes_count()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Listing.objects.filter(pk=obj.listing_id).sync_likes_count()
+
+    def delete_queryset(self, request, queryset):
+        listing_ids = list(queryset.values_list('listing_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        Listing.objects.filter(pk__in=listing_ids).sync_likes_count()
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'listings_created', 'listings_deactivated', 'applications', 'likes')
+    date_hierarchy = 'date'
@@ -0,0 +1,194 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from . import sync
+from .models import Listing, ListingTombstone, Location
+
+
+# ───── Автодополнение: города, районы, адреса ─────
+# Индекс живёт в памяти процесса: отсортированный список (ключ, значение), поиск
+# по префиксу — bisect и проход по диапазону, без запросов к БД. Ключ заводится на
+# каждое слово, так что «киев» находит «ул. Киевская, 1».
+# Раз в AUTOCOMPLETE_REFRESH_SECONDS или сразу после изменения в этом же процессе
+# индекс перечитывает таблицу локаций (она маленькая) и сравнивает с тем, что в
+# памяти: так правки из других воркеров видны без общего кэша. Если локации те же,
+# адреса догоняются по change_seq (как /listings/sync/), иначе читаются заново.
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Сколько ключей диапазона просматривать при фильтре по городу
+MAX_SCAN = 2000
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.lower().replace('ё', 'е')))
+
+
+def keys(text):
+    """Ключ на каждое слово: «ул киевская 1», «киевская 1». Номера домов ключей не дают."""
+    words = normalize(text).split()
+    return [' '.join(words[i:]) for i, word in enumerate(words) if i == 0 or not word.isdigit()]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.entries = []
+
+    def add(self, text, value):
+        for key in keys(text):
+            insort(self.entries, (key, value))
+
+    def remove(self, text, value):
+        for key in keys(text):
+            position = bisect_left(self.entries, (key, value))
+            if position < len(self.entries) and self.entries[position] == (key, value):
+                del self.entries[position]
+
+    def rebuild(self, items):
+        self.entries = sorted((key, value) for text, value in items for key in keys(text))
+
+    def search(self, prefix, limit, accept=None):
+        found, seen = [], set()
+        position = bisect_left(self.entries, (prefix,))
+        for key, value in self.entries[position:position + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            if value in seen or (accept and not accept(value)):
+                continue
+            seen.add(value)
+            found.append(value)
+            if len(found) >= limit:
+                break
+        return found
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.places = PrefixIndex()
+        self.addresses = PrefixIndex()
+        # (город, адрес) → число активных объявлений; объявление → его (город, адрес)
+        self.address_counts = {}
+        self.listing_addresses = {}
+        self.locations = {}
+        self.seq = None
+        self.checked = 0.0
+        self.stale = True
+
+    def mark_stale(self):
+        self.stale = True
+
+    # ─── Загрузка ───
+    def refresh(self):
+        if not self.stale and time.monotonic() - self.checked < settings.AUTOCOMPLETE_REFRESH_SECONDS:
+            return
+        with self.lock:
+            # Флаг снимаем до чтения: изменение во время загрузки вызовет ещё одну
+            self.stale = False
+            rows = Location.objects.values_list('id', 'city', 'district')
+            locations = {pk: (city, district) for pk, city, district in rows}
+            if self.seq is None or locations != self.locations:
+                # Город входит в ключ адреса: после правки локаций адреса перечитываются тоже
+                self.load_locations(locations)
+                self.load_addresses()
+            else:
+                self.apply_changes()
+            self.checked = time.monotonic()
+
+    def load_locations(self, locations):
+        self.locations = locations
+        cities = {city for city, _ in self.locations.values()}
+        # (тип, название, город, id локации)
+        self.places.rebuild(
+            [(city, ('city', city, city, 0)) for city in cities]
+            + [(district, ('district', district, city, pk)) for pk, (city, district) in self.locations.items()]
+        )
+
+    def listing_key(self, address, location_id):
+        city = self.locations.get(location_id, ('', ''))[0]
+        return city, address.strip()
+
+    def load_addresses(self):
+        self.seq = sync.current_seq()
+        self.address_counts, self.listing_addresses = {}, {}
+        rows = Listing.objects.active().values_list('id', 'address', 'location_id').iterator(chunk_size=5000)
+        for pk, address, location_id in rows:
+            key = self.listing_key(address, location_id)
+            # Один объект ключа на все объявления с этим адресом
+            key = self.listing_addresses[pk] = self.address_counts.setdefault(key, [key, 0])[0]
+            self.address_counts[key][1] += 1
+        self.addresses.rebuild((address, (city, address)) for city, address in self.address_counts)
+
+    def apply_changes(self):
+        current = sync.current_seq()
+        if current <= self.seq:
+            return
+        changed = Listing.objects.filter(change_seq__gt=self.seq).values_list(
+            'id', 'address', 'location_id', 'is_active'
+        )
+        for pk, address, location_id, is_active in changed:
+            self.unlink(pk)
+            if location_id is not None and location_id not in self.locations:
+                # Локацию создали после чтения таблицы: следующий запрос перечитает всё
+                self.stale = True
+            if is_active:
+                self.link(pk, self.listing_key(address, location_id))
+        for pk in ListingTombstone.objects.filter(change_seq__gt=self.seq).values_list('listing_id', flat=True):
+            self.unlink(pk)
+        self.seq = current
+
+    def link(self, pk, key):
+        entry = self.address_counts.get(key)
+        if entry is None:
+            entry = self.address_counts[key] = [key, 0]
+            self.addresses.add(key[1], key)
+        entry[1] += 1
+        self.listing_addresses[pk] = entry[0]
+
+    def unlink(self, pk):
+        key = self.listing_addresses.pop(pk, None)
+        if key is None:
+            return
+        entry = self.address_counts[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.address_counts[key]
+            self.addresses.remove(key[1], key)
+
+    # ─── Поиск ───
+    def suggest(self, text, limit=DEFAULT_LIMIT, city=None):
+        """Сначала города и районы, затем адреса. city — только в этом городе."""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        self.refresh()
+        with self.lock:
+            place_filter = address_filter = None
+            if city:
+                cities = {name for name, _ in self.locations.values() if normalize(name) == normalize(city)}
+                place_filter = lambda value: value[2] in cities
+                address_filter = lambda value: value[0] in cities
+            places = self.places.search(prefix, limit, place_filter)
+            addresses = []
+            if len(places) < limit:
+                addresses = self.addresses.search(prefix, limit - len(places), address_filter)
+            counts = [self.address_counts[key][1] for key in addresses]
+
+        results = []
+        for kind, name, place_city, pk in places:
+            if kind == 'city':
+                results.append({'type': 'city', 'value': name})
+            else:
+                results.append({'type': 'district', 'value': name, 'city': place_city, 'location_id': pk})
+        for (address_city, address), count in zip(addresses, counts):
+            results.append({'type': 'address', 'value': address, 'city': address_city, 'listings': count})
+        return results
+
+
+index = AutocompleteIndex()
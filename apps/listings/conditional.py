@@ -0,0 +1,52 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+# ───── Условные GET (ETag / Last-Modified) ─────
+# Валидаторы считаются без сериализаторов: для карточки — из change_seq и likes_count
+# одной лёгкой выборкой, для списков — при заполнении кэша ответов (response_cache).
+# Совпал If-None-Match / If-Modified-Since — сразу 304.
+
+
+def has_validators(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def make_etag(*parts):
+    # Слабый: тело может меняться при сжатии, смысл — тот же
+    return f'W/"{hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()[:20]}"'
+
+
+def data_etag(data):
+    return make_etag(json.dumps(data, sort_keys=True, default=str))
+
+
+def listing_validators(pk, change_seq, likes_count, updated_at):
+    # Лайки не двигают change_seq, поэтому входят в ETag отдельно
+    return make_etag('listing', pk, change_seq, likes_count), int(updated_at.timestamp())
+
+
+def apply_headers(request, response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    if request.user.is_authenticated:
+        # Ответ зависит от пользователя: только браузер, и всегда с проверкой
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        # Браузер каждый раз сверяет ETag, CDN держит копию не дольше кэша ответов
+        patch_cache_control(
+            response, public=True, max_age=0, s_maxage=settings.RESPONSE_CACHE_TTL, must_revalidate=True,
+        )
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """304 (или 412 для If-Match), если тело отдавать не нужно; иначе None."""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
@@ -0,0 +1,116 @@
+import csv
+import json
+from io import StringIO
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+# ───── Потоковая выгрузка ─────
+# Строки читаются через values_list().iterator(): без моделей и без всей выборки
+# в памяти (на Postgres — серверный курсор), и сразу уходят клиенту.
+
+CHUNK_SIZE = 2000
+# Строк в одном куске ответа: по строке на yield — слишком много мелких записей в сокет
+LINES_PER_CHUNK = 500
+
+LISTING_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('deal_type', 'deal_type'),
+    ('price', 'price'),
+    ('rooms', 'rooms'),
+    ('area', 'area'),
+    ('city', 'location__city'),
+    ('district', 'location__district'),
+    ('address', 'address'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('is_active', 'is_active'),
+    ('likes_count', 'likes_count'),
+    ('created_at', 'created_at'),
+]
+
+APPLICATION_COLUMNS = [
+    ('id', 'id'),
+    ('listing_id', 'listing_id'),
+    ('listing_title', 'listing__title'),
+    ('user', 'user__username'),
+    ('contact_phone', 'contact_phone'),
+    ('message', 'message'),
+    ('created_at', 'created_at'),
+]
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# Свободный текст из форм: только его проверяем на формулы
+TEXT_COLUMNS = {'title', 'address', 'city', 'district', 'listing_title', 'user', 'contact_phone', 'message'}
+
+
+def safe_cell(value):
+    # Ячейка вида =HYPERLINK(...) выполнится в Excel; телефоны +996... не трогаем
+    if value and (value[0] in '=@\t\r' or (value[0] in '+-' and not value[1:].replace(' ', '').isdigit())):
+        return "'" + value
+    return value
+
+
+def batches(rows, size=LINES_PER_CHUNK):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def csv_rows(headers, rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    # BOM — чтобы Excel открыл кириллицу в UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    text = [i for i, header in enumerate(headers) if header in TEXT_COLUMNS]
+    for batch in batches(rows):
+        for row in batch:
+            for i in text:
+                if row[i]:
+                    row[i] = safe_cell(row[i])
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_rows(headers, rows):
+    for batch in batches(rows):
+        yield ''.join(json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + '\n' for row in batch)
+
+
+WRITERS = {
+    'csv': csv_rows,
+    'ndjson': ndjson_rows,
+}
+
+
+def stream(queryset, columns, fmt, name):
+    headers = [header for header, _ in columns]
+    rows = (
+        list(row) for row in
+        queryset.order_by('pk').values_list(*[field for _, field in columns]).iterator(chunk_size=CHUNK_SIZE)
+    )
+    response = StreamingHttpResponse(WRITERS[fmt](headers, rows), content_type=FORMATS[fmt])
+    filename = f'{name}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_listings(queryset, fmt):
+    return stream(queryset, LISTING_COLUMNS, fmt, 'listings')
+
+
+def export_applications(queryset, fmt):
+    return stream(queryset, APPLICATION_COLUMNS, fmt, 'applications')
@@ -0,0 +1,103 @@
+from django.db.models import Case, Count, IntegerField, Value, When
+from django_filters.filterset import filterset_factory
+from django_filters.utils import translate_validation
+
+from . import search
+from .filters import LISTING_FILTER_FIELDS, geo_filter
+from .models import Listing
+
+
+# ───── Счётчики для фильтров ленты ─────
+# Каждый фасет считается одним GROUP BY по выборке со всеми фильтрами, кроме его
+# собственного: выбранный город не обнуляет счётчики соседних городов.
+
+# Границы ценовых корзин; последняя открыта сверху
+PRICE_BUCKETS = (0, 10000, 50000, 100000, 200000)
+
+ListingFilterSet = filterset_factory(Listing, fields=LISTING_FILTER_FIELDS)
+
+
+def filter_params(fields):
+    return {
+        field if lookup == 'exact' else f'{field}__{lookup}'
+        for field in fields for lookup in LISTING_FILTER_FIELDS[field]
+    }
+
+
+class Facet:
+    def __init__(self, name, fields, group_by):
+        self.name = name
+        # Параметры запроса, которые этот фасет игнорирует
+        self.own_params = filter_params(fields)
+        self.group_by = group_by
+
+    def annotate(self, queryset):
+        return queryset
+
+    def rows(self, queryset):
+        return (
+            self.annotate(queryset).order_by()
+            .values(*self.group_by).annotate(count=Count('id'))
+            .order_by('-count', *self.group_by)
+        )
+
+    def format(self, row):
+        return {'value': row[self.group_by[0]], 'count': row['count']}
+
+
+class DistrictFacet(Facet):
+    # Названия районов повторяются в разных городах
+    def format(self, row):
+        return {'city': row['location__city'], 'value': row['location__district'], 'count': row['count']}
+
+
+class PriceFacet(Facet):
+    def annotate(self, queryset):
+        bounds = PRICE_BUCKETS[1:]
+        return queryset.annotate(price_bucket=Case(
+            *[When(price__lt=upper, then=Value(i)) for i, upper in enumerate(bounds)],
+            default=Value(len(bounds)),
+            output_field=IntegerField(),
+        ))
+
+    def rows(self, queryset):
+        return sorted(super().rows(queryset), key=lambda row: row['price_bucket'])
+
+    def format(self, row):
+        index = row['price_bucket']
+        upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+        return {'min': PRICE_BUCKETS[index], 'max': upper, 'count': row['count']}
+
+
+FACETS = (
+    Facet('city', ['location__city'], ['location__city']),
+    DistrictFacet('district', ['location__district'], ['location__city', 'location__district']),
+    Facet('rooms', ['rooms'], ['rooms']),
+    Facet('deal_type', ['deal_type'], ['deal_type']),
+    PriceFacet('price', ['price'], ['price_bucket']),
+)
+
+
+def is_filtered(query_params):
+    params = filter_params(LISTING_FILTER_FIELDS) | {'search', 'bbox', 'radius'}
+    return any(query_params.get(param) for param in params)
+
+
+def filtered(queryset, query_params, exclude=()):
+    data = query_params.copy()
+    for param in exclude:
+        data.pop(param, None)
+    filterset = ListingFilterSet(data, queryset=queryset)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    queryset = geo_filter(filterset.qs, data)
+    text = data.get('search', '').strip()
+    return search.matching(queryset, text) if text else queryset
+
+
+def collect_facets(queryset, query_params):
+    """По одному агрегатному запросу на фасет, независимо от числа значений."""
+    return {
+        facet.name: [facet.format(row) for row in facet.rows(filtered(queryset, query_params, facet.own_params))]
+        for facet in FACETS
+    }
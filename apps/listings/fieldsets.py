@@ -0,0 +1,72 @@
+from rest_framework.exceptions import ValidationError
+
+from .serializers import LocationSerializer
+
+
+# ───── Выборочные поля (?fields= / ?omit=) ─────
+# ?fields=id,title,price — только эти поля, ?omit=description — все, кроме этих.
+# Набор полей сужает и SQL: лишние колонки не читаются (only), location не
+# джойнится, а фото не подгружаются, если их нет в ответе. id отдаётся всегда.
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def split(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def requested(query_params, available):
+    """Поля ответа в порядке сериализатора; None — без ограничений."""
+    fields, omit = split(query_params.get(FIELDS_PARAM)), split(query_params.get(OMIT_PARAM))
+    if not fields and not omit:
+        return None
+    unknown = (fields | omit) - set(available)
+    if unknown:
+        raise ValidationError({
+            FIELDS_PARAM: f'Неизвестные поля: {", ".join(sorted(unknown))}. '
+                          f'Допустимые: {", ".join(available)}'
+        })
+    selected = (fields or set(available)) - omit
+    return [name for name in available if name in selected or name == 'id']
+
+
+def narrow(queryset, fields, keep=()):
+    """
+    for_api() только под выбранные поля. keep — колонки, нужные помимо ответа
+    (сортировка и курсор пагинации).
+    """
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    only = [name for name in (*fields, *keep) if name in columns]
+    if 'location' in fields:
+        only += [f'location__{name}' for name in LocationSerializer.Meta.fields]
+    return queryset.for_api(location='location' in fields, images='images' in fields).only(*only)
+
+
+class SparseFieldsMixin:
+    """
+    Для GET-вьюх объявлений: разбирает ?fields= / ?omit=, передаёт набор полей
+    сериализатору (context['fields']) и сужает queryset. sparse_keep и ordering_fields
+    вьюхи загружаются всегда.
+    """
+    # Курсор пагинации читает поле сортировки у строк страницы
+    sparse_keep = ('created_at',)
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            if self.request.method == 'GET':
+                available = self.get_serializer_class().Meta.fields
+                self._sparse_fields = requested(self.request.query_params, available)
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def api_queryset(self, queryset):
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset.for_api()
+        return narrow(queryset, fields, [*self.sparse_keep, *getattr(self, 'ordering_fields', ())])
@@ -0,0 +1,92 @@
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from . import geo, search
+
+
+# Фильтры ленты объявлений: общие для /listings/ и /listings/facets/
+LISTING_FILTER_FIELDS = {
+    'location__city': ['exact'],
+    'location__district': ['exact'],
+    'deal_type': ['exact'],
+    'price': ['gte', 'lte'],
+    'rooms': ['exact'],
+    'area': ['gte', 'lte'],
+}
+
+
+# ───── Полнотекстовый поиск по индексу ─────
+class ListingSearchFilter(filters.BaseFilterBackend):
+    """
+    Замена SearchFilter: вместо LIKE '%term%' по трём колонкам ищет
+    по инвертированному индексу listings_search и добавляет search_rank.
+    """
+    search_param = 'search'
+
+    def get_search_text(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def has_terms(self, request):
+        # «в», «"», «*» не дают ни одного слова: поиск не применяется и search_rank нет
+        return bool(search.tokenize(self.get_search_text(request)))
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_text(request)
+        if not text:
+            return queryset
+        return search.search(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Полнотекстовый поиск по заголовку, описанию и адресу',
+            'schema': {'type': 'string'},
+        }]
+
+
+# ───── Карта ─────
+def geo_filter(queryset, params, max_radius_km=100):
+    if params.get('bbox'):
+        try:
+            queryset = queryset.in_bbox(geo.parse_bbox(params['bbox']))
+        except ValueError as exc:
+            raise ValidationError({'bbox': str(exc)})
+    if params.get('radius'):
+        try:
+            lat, lng, radius = float(params['lat']), float(params['lng']), float(params['radius'])
+        except (KeyError, ValueError):
+            raise ValidationError({'radius': 'Нужны числовые lat, lng и radius'})
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 0 < radius <= max_radius_km):
+            raise ValidationError({'radius': f'Координаты вне диапазона или radius не в (0, {max_radius_km}]'})
+        queryset = queryset.within_radius(lat, lng, radius)
+    return queryset
+
+
+class ListingGeoFilter(filters.BaseFilterBackend):
+    """?bbox=min_lng,min_lat,max_lng,max_lat и/или ?lat=&lng=&radius= (км)."""
+
+    def filter_queryset(self, request, queryset, view):
+        return geo_filter(queryset, request.query_params)
+
+    def get_schema_operation_parameters(self, view):
+        descriptions = {
+            'bbox': 'Область карты: min_lng,min_lat,max_lng,max_lat',
+            'lat': 'Широта центра для radius',
+            'lng': 'Долгота центра для radius',
+            'radius': 'Радиус поиска, км',
+        }
+        return [
+            {'name': name, 'required': False, 'in': 'query', 'description': description, 'schema': {'type': 'string'}}
+            for name, description in descriptions.items()
+        ]
+
+
+class ListingOrderingFilter(filters.OrderingFilter):
+    """Без явного ?ordering= результаты поиска сортируются по релевантности."""
+
+    def get_default_ordering(self, view):
+        if ListingSearchFilter().has_terms(view.request):
+            return ('-search_rank',)
+        return super().get_default_ordering(view)
@@ -0,0 +1,115 @@
+import math
+
+
+# ───── Геохэш ─────
+# Координаты кодируются строкой base32: общий префикс = общая ячейка сетки.
+# Поиск по области сводится к нескольким диапазонам по B-tree индексу на geohash,
+# без PostGIS и пространственных индексов.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # ~5 м, хранится в Listing.geohash
+EARTH_RADIUS_KM = 6371.0
+# Больше ячеек — точнее покрытие, но длиннее OR в запросе
+MAX_COVER_CELLS = 16
+# Тайл зума z шириной 360/2^z делится на 2^CLUSTER_BITS кластеров по долготе
+CLUSTER_BITS = 3
+MAX_ZOOM = 22
+
+
+def encode(lat, lng, precision=PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        # Биты чередуются: долгота, широта, долгота...
+        target, rng = (lng, lng_range) if even else (lat, lat_range)
+        middle = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if target >= middle:
+            value |= 1
+            rng[0] = middle
+        else:
+            rng[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Размер ячейки (широта, долгота) в градусах."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def prefix_range(prefix):
+    # '~' больше любого символа BASE32: [prefix, prefix~) — все хэши с этим префиксом
+    return prefix, prefix + '~'
+
+
+def cover(bbox, max_cells=MAX_COVER_CELLS):
+    """Префиксы ячеек, целиком покрывающих bbox = (min_lat, min_lng, max_lat, max_lng)."""
+    min_lat, min_lng, max_lat, max_lng = bbox
+    for precision in range(PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        rows = range(math.floor((min_lat + 90) / lat_step), math.floor((max_lat + 90) / lat_step) + 1)
+        cols = range(math.floor((min_lng + 180) / lng_step), math.floor((max_lng + 180) / lng_step) + 1)
+        if len(rows) * len(cols) > max_cells and precision > 1:
+            continue
+        return sorted({
+            encode(
+                min(-90 + (row + 0.5) * lat_step, 90.0),
+                min(-180 + (col + 0.5) * lng_step, 180.0),
+                precision,
+            )
+            for row in rows for col in cols
+        })
+
+
+def radius_bbox(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # У полюсов круг накрывает все долготы
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-6 else min(math.degrees(radius_km / EARTH_RADIUS_KM / cos_lat), 180.0)
+    return (max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0))
+
+
+def zoom_precision(zoom):
+    """Самая грубая точность геохэша, у которой ячейка меньше тайла хотя бы в 2^CLUSTER_BITS раз."""
+    for precision in range(1, PRECISION + 1):
+        if math.ceil(precision * 5 / 2) >= zoom + CLUSTER_BITS:
+            return precision
+    return PRECISION
+
+
+def tile_bbox(zoom, x, y):
+    """Границы тайла z/x/y (схема OSM/Google) как (min_lat, min_lng, max_lat, max_lng)."""
+    n = 2 ** zoom
+    if not (0 <= zoom <= MAX_ZOOM and 0 <= x < n and 0 <= y < n):
+        raise ValueError('tile: ожидается z/x/y в пределах сетки')
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def parse_tile(value):
+    try:
+        zoom, x, y = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError('tile: ожидается z/x/y')
+    return zoom, tile_bbox(zoom, x, y)
+
+
+def parse_bbox(value):
+    """'min_lng,min_lat,max_lng,max_lat' (порядок как у карт) → (min_lat, min_lng, max_lat, max_lng)."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox: ожидается min_lng,min_lat,max_lng,max_lat')
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError('bbox: координаты вне диапазона или перепутаны')
+    return min_lat, min_lng, max_lat, max_lng
@@ -0,0 +1,171 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image
+
+from . import response_cache
+
+
+# ───── Фоновая конвертация фото в WEBP и нарезка размеров ─────
+# Очередь — сами строки ListingImage в статусе pending. Потоки делают I/O и запросы
+# к БД, декодирование/кодирование Pillow уходит в пул процессов (CPU-bound).
+
+VARIANTS_DIR = 'listing_images/variants'
+
+
+def encode_webp(img, quality=75):
+    output = BytesIO()
+    img.save(output, format='WEBP', quality=quality)
+    return output.getvalue()
+
+
+def render_image(data, widths, convert):
+    """
+    Возвращает (WEBP-оригинал или None, {ширина: WEBP}).
+    Размеры шире исходника не создаются — апскейл только раздувает файл.
+    """
+    img = Image.open(BytesIO(data))
+    if img.mode in ("RGBA", "P"):
+        img = img.convert("RGB")
+    original = encode_webp(img) if convert else None
+    variants = {}
+    for width in widths:
+        if width >= img.width:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        variants[width] = encode_webp(img.resize((width, height), Image.LANCZOS))
+    return original, variants
+
+
+def variant_name(digest, width):
+    # Имя зависит только от содержимого исходника: одинаковые фото делят файлы,
+    # а сами файлы неизменяемы и кэшируются навсегда
+    return f'{VARIANTS_DIR}/{digest}_{width}w.webp'
+
+
+def process_image(image_id, render=render_image):
+    """Конвертирует одно фото, нарезает размеры и подменяет файл. True — если результат записан."""
+    from .models import Listing, ListingImage
+
+    # Захват задачи: только один воркер переводит pending → processing
+    claimed = ListingImage.objects.filter(
+        pk=image_id, status=ListingImage.STATUS_PENDING
+    ).update(status=ListingImage.STATUS_PROCESSING)
+    if not claimed:
+        return False
+
+    image = ListingImage.objects.get(pk=image_id)
+    storage = image.image.storage
+    source_name = image.image.name
+    widths = settings.LISTING_IMAGE_VARIANT_WIDTHS
+    final_name = source_name
+    try:
+        with storage.open(source_name, 'rb') as source:
+            data = source.read()
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        sizes = {width: variant_name(digest, width) for width in widths}
+        missing = [width for width, name in sizes.items() if not storage.exists(name)]
+        original, rendered = render(data, missing, not source_name.lower().endswith('.webp'))
+
+        for width, content in rendered.items():
+            sizes[width] = storage.save(sizes[width], ContentFile(content))
+        sizes = {str(width): name for width, name in sizes.items() if width in rendered or width not in missing}
+
+        if original is not None:
+            final_name = storage.save(os.path.splitext(source_name)[0] + '.webp', ContentFile(original))
+        # Если за время обработки фото заменили, наш результат уже не нужен
+        swapped = ListingImage.objects.filter(pk=image_id, image=source_name).update(
+            image=final_name,
+            variants={'source': final_name, 'sizes': sizes},
+            status=ListingImage.STATUS_READY,
+            processing_error='',
+        )
+    except Exception as exc:
+        failed = ListingImage.objects.filter(pk=image_id, image=source_name).update(
+            status=ListingImage.STATUS_FAILED, processing_error=str(exc)
+        )
+        if not failed:
+            requeue(image_id, source_name)
+        return False
+
+    if final_name != source_name:
+        storage.delete(source_name if swapped else final_name)
+    if swapped:
+        # update() не шлёт сигналов — сбрасываем кэш выдачи и оповещаем синхронизацию сами
+        Listing.objects.filter(pk=image.listing_id).touch()
+        response_cache.invalidate('listings')
+    else:
+        requeue(image_id, source_name)
+    return bool(swapped)
+
+
+def requeue(image_id, source_name):
+    """Фото заменили во время обработки: новый исходник снова в pending и в очередь."""
+    from .models import ListingImage
+
+    requeued = ListingImage.objects.filter(pk=image_id, status=ListingImage.STATUS_PROCESSING).exclude(
+        image=source_name
+    ).update(status=ListingImage.STATUS_PENDING, processing_error='')
+    if requeued:
+        enqueue(image_id)
+
+
+class ImagePipeline:
+    def __init__(self, workers):
+        self.workers = workers
+        self.processes = None
+        self.threads = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.threads is None:
+                # spawn: форк многопоточного веб-процесса небезопасен
+                self.processes = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self.threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='listing-images')
+
+    def render(self, data, widths, convert):
+        return self.processes.submit(render_image, data, widths, convert).result()
+
+    def run(self, image_id):
+        try:
+            return process_image(image_id, render=self.render)
+        finally:
+            connections.close_all()
+
+    def submit(self, image_id):
+        self.start()
+        return self.threads.submit(self.run, image_id)
+
+    def shutdown(self):
+        with self.lock:
+            if self.threads is not None:
+                self.threads.shutdown()
+                self.processes.shutdown()
+                self.threads = self.processes = None
+
+
+_pipeline = None
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ImagePipeline(settings.LISTING_IMAGE_WORKERS)
+    return _pipeline
+
+
+def enqueue(image_id):
+    if settings.LISTING_IMAGE_ASYNC:
+        get_pipeline().submit(image_id)
+    else:
+        process_image(image_id)
@@ -0,0 +1,347 @@
+import csv
+import io
+import ipaddress
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlparse
+from urllib.request import HTTPHandler, HTTPRedirectHandler, HTTPSHandler, Request, build_opener
+from xml.etree.ElementTree import iterparse
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import autocomplete, response_cache, search
+from .models import ChangeCounter, DailyStats, Listing, ListingImage, Location
+from .serializers import ListingImportRowSerializer
+
+
+# ───── Импорт фидов партнёров ─────
+# Фид читается потоково (csv.DictReader / iterparse), строки проверяются по одной,
+# а в базу уходят пачками: один SELECT по external_id, один bulk_create и один
+# bulk_update на пачку. Ошибка в строке попадает в отчёт и не прерывает импорт.
+
+FORMATS = ('csv', 'xml')
+# Поля, которые фид может менять у уже загруженного объявления
+UPDATE_FIELDS = [
+    'title', 'description', 'price', 'rooms', 'area', 'location', 'address',
+    'deal_type', 'latitude', 'longitude', 'geohash', 'is_active',
+]
+# Поля, попадающие в поисковый индекс (search.document), и снятие с публикации
+SEARCH_FIELDS = {'title', 'description', 'address', 'is_active'}
+# Отчёт не должен расти вместе с фидом на 500k битых строк
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(name):
+    extension = os.path.splitext(name or '')[1].lstrip('.').lower()
+    return extension if extension in FORMATS else None
+
+
+def parse_csv(stream):
+    """Колонки — поля ListingImportRowSerializer, фото — URL через «|» в колонке images."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        images = row.pop('images', None) or ''
+        data = {
+            key.strip(): value.strip() for key, value in row.items()
+            if key and isinstance(value, str) and value.strip()
+        }
+        data['images'] = [url.strip() for url in images.split('|') if url.strip()]
+        yield data
+
+
+def parse_xml(stream):
+    """<listings><listing><external_id>…</external_id>…<images><image>URL</image></images></listing></listings>"""
+    parents = []
+    for event, element in iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag != 'listing':
+            continue
+        data = {'images': []}
+        for child in element:
+            if child.tag == 'images':
+                data['images'] = [image.text.strip() for image in child if image.text and image.text.strip()]
+            elif child.text and child.text.strip():
+                data[child.tag] = child.text.strip()
+        yield data
+        # Разобранные объявления не копятся в дереве
+        if parents:
+            parents[-1].remove(element)
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'xml': parse_xml,
+}
+
+
+# ───── Скачивание фото ─────
+def check_url(url):
+    """Только http(s) и только публичные адреса: импорт не должен ходить во внутреннюю сеть."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError(f'Недопустимый URL: {url}')
+    for info in socket.getaddrinfo(parsed.hostname, parsed.port or 80, proto=socket.IPPROTO_TCP):
+        if not ipaddress.ip_address(info[4][0]).is_global:
+            raise ValueError(f'Адрес {parsed.hostname} недоступен для импорта')
+
+
+def connect_public(address, *args, **kwargs):
+    """
+    socket.create_connection с проверкой адреса, к которому реально подключились:
+    check_url резолвит имя отдельно, и DNS rebinding мог бы подменить ответ.
+    """
+    sock = socket.create_connection(address, *args, **kwargs)
+    if not ipaddress.ip_address(sock.getpeername()[0]).is_global:
+        sock.close()
+        raise ValueError(f'Адрес {address[0]} недоступен для импорта')
+    return sock
+
+
+class CheckedHTTPConnection(HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # connect() открывает сокет через этот атрибут (и для HTTPS, до TLS)
+        self._create_connection = connect_public
+
+
+class CheckedHTTPSConnection(HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = connect_public
+
+
+class CheckedHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(CheckedHTTPConnection, req)
+
+
+class CheckedHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(CheckedHTTPSConnection, req, context=self._context)
+
+
+class CheckedRedirectHandler(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch_image(url):
+    check_url(url)
+    opener = build_opener(CheckedHTTPHandler, CheckedHTTPSHandler, CheckedRedirectHandler)
+    limit = settings.LISTING_IMPORT_IMAGE_MAX_BYTES
+    request = Request(url, headers={'User-Agent': 'realtor-import'})
+    with opener.open(request, timeout=settings.LISTING_IMPORT_IMAGE_TIMEOUT) as response:
+        data = response.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError(f'Файл больше {limit} байт: {url}')
+    return data
+
+
+# Расширение файла берётся по содержимому, а не из URL (.html, .svg, ...)
+IMAGE_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+def image_extension(data):
+    """Проверяет, что data — картинка допустимого формата, и возвращает расширение."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            kind = image.format
+            image.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise ValueError('Файл не является изображением')
+    if kind not in IMAGE_EXTENSIONS:
+        raise ValueError(f'Формат {kind} не поддерживается')
+    return IMAGE_EXTENSIONS[kind]
+
+
+# ───── Импорт ─────
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.images = 0
+        self.errors = []
+
+    def error(self, row, external_id, errors, fatal=True):
+        if fatal:
+            self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'external_id': external_id, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'images': self.images,
+            'errors': self.errors,
+        }
+
+
+class LocationCache:
+    """(город, район) → id. Справочник маленький: грузится целиком, новые создаются по мере надобности."""
+
+    def __init__(self):
+        self.ids = {(city, district): pk for pk, city, district in Location.objects.values_list('pk', 'city', 'district')}
+
+    def get(self, city, district):
+        key = (city, district)
+        if key not in self.ids:
+            location, _ = Location.objects.get_or_create(city=city, district=district)
+            self.ids[key] = location.pk
+        return self.ids[key]
+
+
+class ListingImporter:
+    """
+    Загружает объявления owner из фида. Новые создаются через bulk_create, уже
+    загруженные (по owner + external_id) обновляются через bulk_update, если что-то
+    изменилось. Фото скачиваются пулом потоков только для новых объявлений,
+    конвертацию делает фоновый конвейер images.py.
+    """
+
+    def __init__(self, owner, batch_size=None, image_workers=None, fetch=fetch_image):
+        self.owner = owner
+        self.batch_size = batch_size or settings.LISTING_IMPORT_BATCH_SIZE
+        self.image_workers = image_workers or settings.LISTING_IMPORT_IMAGE_WORKERS
+        self.fetch = fetch
+        self.locations = LocationCache()
+
+    def run(self, rows):
+        report = ImportReport()
+        # Один экземпляр на весь фид: иначе построение полей сериализатора
+        # (deepcopy) съедает больше времени, чем сама проверка
+        validator = ListingImportRowSerializer()
+        batch = []
+        with ThreadPoolExecutor(self.image_workers) as pool:
+            for number, raw in enumerate(rows, start=1):
+                try:
+                    data = validator.run_validation(raw)
+                except ValidationError as exc:
+                    report.error(number, raw.get('external_id'), exc.detail)
+                    continue
+                batch.append((number, data))
+                if len(batch) >= self.batch_size:
+                    self.write(batch, report, pool)
+                    batch = []
+            if batch:
+                self.write(batch, report, pool)
+        return report
+
+    def apply(self, listing, data):
+        """Переносит строку фида в объявление. Возвращает множество изменённых полей."""
+        values = {field: data.get(field) for field in UPDATE_FIELDS if field not in ('location', 'geohash')}
+        values['location_id'] = self.locations.get(data['city'], data['district'])
+        changed = set()
+        for field, value in values.items():
+            if getattr(listing, field) != value:
+                setattr(listing, field, value)
+                changed.add('location' if field == 'location_id' else field)
+        if changed & {'latitude', 'longitude'}:
+            listing.update_geohash()
+            changed.add('geohash')
+        return changed
+
+    def write(self, batch, report, pool):
+        rows = {}
+        for number, data in batch:
+            if data['external_id'] in rows:
+                report.error(number, data['external_id'], ['external_id повторяется в фиде'])
+                continue
+            rows[data['external_id']] = (number, data)
+
+        existing = {
+            listing.external_id: listing
+            for listing in Listing.objects.filter(owner=self.owner, external_id__in=rows)
+        }
+        created, updated, reindexed = [], [], []
+        changed_fields, deactivated = set(), 0
+        for external_id, (number, data) in rows.items():
+            listing = existing.get(external_id)
+            if listing is None:
+                listing = Listing(owner=self.owner, external_id=external_id)
+                self.apply(listing, data)
+                listing.update_geohash()
+                created.append(listing)
+                continue
+            was_active = listing.is_active
+            changed = self.apply(listing, data)
+            if not changed:
+                report.unchanged += 1
+                continue
+            updated.append(listing)
+            changed_fields |= changed
+            deactivated += was_active and not listing.is_active
+            if changed & SEARCH_FIELDS:
+                reindexed.append(listing.pk)
+
+        with transaction.atomic():
+            # Один номер изменения на пачку: клиенты /listings/sync/ получат её целиком
+            if created or updated:
+                change_seq, now = ChangeCounter.next(Listing.SYNC_COUNTER), timezone.now()
+                for listing in created + updated:
+                    listing.change_seq, listing.updated_at = change_seq, now
+            Listing.objects.bulk_create(created)
+            if updated:
+                # Только реально изменённые колонки: bulk_update строит CASE WHEN
+                # на каждую пару (строка, поле), и его сборка дороже самого UPDATE
+                Listing.objects.bulk_update(updated, sorted(changed_fields | {'change_seq', 'updated_at'}))
+            if created or deactivated:
+                DailyStats.bump(listings_created=len(created), listings_deactivated=deactivated)
+            # bulk-операции не шлют сигналов: индекс и кэш обновляем сами
+            search.reindex(Listing.objects.filter(pk__in=[listing.pk for listing in created] + reindexed))
+        if created or updated:
+            response_cache.invalidate('listings')
+            autocomplete.index.mark_stale()
+        report.created += len(created)
+        report.updated += len(updated)
+
+        self.attach_images(created, rows, report, pool)
+
+    def download(self, url):
+        data = self.fetch(url)
+        return data, image_extension(data)
+
+    def attach_images(self, listings, rows, report, pool):
+        jobs = [
+            (listing, position, url, pool.submit(self.download, url))
+            for listing in listings
+            for position, url in enumerate(rows[listing.external_id][1]['images'])
+        ]
+        # Сначала дожидаемся всех скачиваний и пишем файлы: транзакция не должна
+        # держать блокировку ChangeCounter (сигнал фото) на время сетевых таймаутов
+        images = []
+        for listing, position, url, future in jobs:
+            try:
+                data, extension = future.result()
+            except Exception as exc:
+                number = rows[listing.external_id][0]
+                report.error(number, listing.external_id, [f'Фото {url}: {exc}'], fatal=False)
+                continue
+            image = ListingImage(listing=listing)
+            image.image.save(f'{listing.pk}-{position}{extension}', ContentFile(data), save=False)
+            images.append(image)
+
+        with transaction.atomic():
+            for image in images:
+                image.save()
+        report.images += len(images)
+
+
+def import_feed(owner, stream, fmt, **kwargs):
+    return ListingImporter(owner, **kwargs).run(PARSERS[fmt](stream))
@@ -0,0 +1,251 @@
+import itertools
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from apps.listings import sync
+from apps.listings.models import Listing
+from apps.users.models import User
+from apps.users.tokens import RoleRefreshToken
+
+
+LISTINGS = '/api/v1/listings'
+USERS = '/api/v1/users'
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'api_baseline.json'
+
+# Смесь фильтров ленты: то, что реально шлёт фронтенд
+LISTING_QUERIES = [
+    '',
+    '?location__city=Бишкек',
+    '?location__city=Бишкек&location__district=Октябрьский',
+    '?deal_type=sale&price__gte=40000&price__lte=90000',
+    '?deal_type=rent&rooms=2',
+    '?area__gte=40&area__lte=80&ordering=price',
+    '?ordering=-likes_count',
+    '?search=квартира',
+    '?search=студия ремонт&deal_type=sale',
+    '?page_size=100',
+]
+
+# Карта: весь Бишкек на разных масштабах
+CLUSTER_QUERIES = [
+    '?bbox=74.45,42.80,74.70,42.93&zoom=10',
+    '?bbox=74.45,42.80,74.70,42.93&zoom=13',
+    '?bbox=74.55,42.85,74.62,42.89&zoom=15&deal_type=sale',
+]
+
+AUTOCOMPLETE_QUERIES = ['би', 'бишк', 'окт', 'ул', 'киев', 'ч', 'центр&city=Бишкек']
+
+FEED_HEADER = 'external_id,title,description,price,rooms,area,city,district,address,deal_type,latitude,longitude,images\n'
+# Строк в фиде импорта; фотографий нет, чтобы прогон не ходил в сеть
+FEED_ROWS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты apps/listings/urls.py и apps/users/urls.py со смесью фильтров, '
+        'считает p50/p95/p99 и число SQL-запросов. Падает, если сохранённый baseline ухудшился. '
+        'Все изменения в БД откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Запросов на сценарий')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Записать результаты как baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост p95 относительно baseline (0.25 = +25%%)',
+        )
+        parser.add_argument('--only', nargs='*', help='Запустить только эти сценарии')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.counter = itertools.count()
+        with transaction.atomic():
+            self.prepare()
+            results = self.run(options['requests'], options['only'])
+            transaction.set_rollback(True)
+
+        self.report(results)
+        if options['save_baseline']:
+            options['baseline'].parent.mkdir(parents=True, exist_ok=True)
+            options['baseline'].write_text(json.dumps(results, indent=2, ensure_ascii=False, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Baseline сохранён: {options["baseline"]}'))
+        elif options['baseline'].exists():
+            baseline = json.loads(options['baseline'].read_text())
+            regressions = self.compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Регрессия относительно baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно baseline нет'))
+
+    # ─── Данные для сценариев ───
+    def prepare(self):
+        self.admin = User.objects.filter(role='admin', is_staff=True).first()
+        listing = Listing.objects.active().exclude(owner__role='admin').first()
+        if self.admin is None or listing is None:
+            raise CommandError('Нет данных: сначала запустите seed_demo_data')
+        self.realtor = listing.owner
+        self.listing_ids = list(Listing.objects.active().values_list('id', flat=True)[:500])
+        self.own_listing_id = listing.pk
+        self.tokens = {user.pk: str(RoleRefreshToken.for_user(user).access_token) for user in (self.admin, self.realtor)}
+        self.refresh = str(RoleRefreshToken.for_user(self.realtor))
+        # Клиент, пропустивший последние ~200 изменений
+        self.sync_cursor = sync.encode_cursor(max(sync.current_seq() - 200, 0), 0)
+        self.realtor.set_password('bench-password')
+        self.realtor.save(update_fields=['password'])
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.tokens[user.pk]}'} if user else {}
+
+    def unique(self, prefix):
+        return f'{prefix}-{next(self.counter)}'
+
+    def feed(self):
+        batch = self.unique('bench')
+        rows = ''.join(
+            f'{batch}-{i},Бенчмарк,Импорт,{self.rng.randint(40000, 90000)},2,54,Бишкек,Центр,ул. Киевская {i},sale,,,\n'
+            for i in range(FEED_ROWS)
+        )
+        return {'file': SimpleUploadedFile('feed.csv', (FEED_HEADER + rows).encode(), content_type='text/csv')}
+
+    def scenarios(self):
+        """Имя → функция, возвращающая (method, path, data, user)."""
+        rng = self.rng
+        new_listing = lambda: {
+            'title': 'Бенчмарк', 'description': 'Тестовое объявление', 'price': '55000',
+            'rooms': 2, 'area': '54', 'address': 'ул. Киевская, 1', 'deal_type': 'sale',
+        }
+        return {
+            'locations:list': lambda: ('get', f'{LISTINGS}/locations/list/', None, None),
+            'locations:tree': lambda: ('get', f'{LISTINGS}/locations/tree/', None, None),
+            'autocomplete': lambda: ('get', f'{LISTINGS}/autocomplete/?q={rng.choice(AUTOCOMPLETE_QUERIES)}', None, None),
+            'locations:create': lambda: (
+                'post', f'{LISTINGS}/locations/create/',
+                {'city': self.unique('Город'), 'district': 'Центр'}, self.realtor,
+            ),
+            'listings:list': lambda: ('get', f'{LISTINGS}/listings/{rng.choice(LISTING_QUERIES)}', None, None),
+            'listings:list-admin': lambda: ('get', f'{LISTINGS}/listings/{rng.choice(LISTING_QUERIES)}', None, self.admin),
+            'listings:trending': lambda: ('get', f'{LISTINGS}/listings/trending/', None, None),
+            'listings:facets': lambda: ('get', f'{LISTINGS}/listings/facets/{rng.choice(LISTING_QUERIES)}', None, None),
+            'listings:clusters': lambda: ('get', f'{LISTINGS}/listings/clusters/{rng.choice(CLUSTER_QUERIES)}', None, None),
+            'listings:sync-initial': lambda: ('get', f'{LISTINGS}/listings/sync/', None, None),
+            'listings:sync-delta': lambda: ('get', f'{LISTINGS}/listings/sync/?cursor={self.sync_cursor}', None, None),
+            'listings:create': lambda: ('post', f'{LISTINGS}/listings/', new_listing(), self.realtor),
+            'listings:detail': lambda: ('get', f'{LISTINGS}/listings/{rng.choice(self.listing_ids)}/', None, None),
+            # Экран избранного: 20 объявлений одним запросом
+            'listings:batch': lambda: (
+                'get', f'{LISTINGS}/listings/batch/?ids='
+                + ','.join(map(str, rng.sample(self.listing_ids, min(20, len(self.listing_ids))))),
+                None, None,
+            ),
+            'listings:similar': lambda: ('get', f'{LISTINGS}/listings/{rng.choice(self.listing_ids)}/similar/', None, None),
+            'listings:update': lambda: (
+                'patch', f'{LISTINGS}/listings/{self.own_listing_id}/',
+                {'price': str(rng.randint(40000, 90000))}, self.realtor,
+            ),
+            'listings:destroy': lambda: ('delete', f'{LISTINGS}/listings/{rng.choice(self.listing_ids)}/', None, self.admin),
+            'listings:like': lambda: ('post', f'{LISTINGS}/listings/{rng.choice(self.listing_ids)}/like/', None, None),
+            'listings:my': lambda: ('get', f'{LISTINGS}/listings/my/', None, self.realtor),
+            'listings:export': lambda: (
+                'get', f'{LISTINGS}/listings/export/?as={rng.choice(["csv", "ndjson"])}', None, self.realtor,
+            ),
+            'listings:import': lambda: ('post', f'{LISTINGS}/listings/import/', self.feed(), self.realtor),
+            'applications:list': lambda: ('get', f'{LISTINGS}/applications/', None, self.realtor),
+            'applications:create': lambda: (
+                'post', f'{LISTINGS}/applications/',
+                {'listing': rng.choice(self.listing_ids), 'contact_phone': '+996555000000', 'message': 'Актуально?'},
+                None,
+            ),
+            'applications:my': lambda: ('get', f'{LISTINGS}/applications/my/', None, self.realtor),
+            'applications:export': lambda: (
+                'get', f'{LISTINGS}/applications/export/?as={rng.choice(["csv", "ndjson"])}', None, self.realtor,
+            ),
+            'admin:stats': lambda: ('get', f'{LISTINGS}/admin/stats/', None, self.admin),
+            'users:token': lambda: (
+                'post', f'{USERS}/auth/token/', {'username': self.realtor.username, 'password': 'bench-password'}, None,
+            ),
+            'users:token-refresh': lambda: ('post', f'{USERS}/auth/token/refresh/', {'refresh': self.refresh}, None),
+            'users:register': lambda: (
+                'post', f'{USERS}/register/',
+                {'username': self.unique('bench-admin'), 'email': 'bench@example.com',
+                 'password': 'Bench-pass-123', 'password2': 'Bench-pass-123'},
+                None,
+            ),
+            'users:create-realtor': lambda: (
+                'post', f'{USERS}/create-realtor/',
+                {'username': self.unique('bench-realtor'), 'email': 'realtor@example.com'}, self.admin,
+            ),
+            'users:me': lambda: ('get', f'{USERS}/me/', None, self.realtor),
+        }
+
+    # ─── Прогон ───
+    def run(self, requests, only):
+        # 5xx считаем ошибкой сценария, а не падением прогона
+        client = Client(raise_request_exception=False)
+        results = {}
+        for name, build in self.scenarios().items():
+            if only and name not in only:
+                continue
+            timings, queries, errors = [], [], 0
+            for _ in range(requests):
+                method, path, data, user = build()
+                # Файл уходит multipart-формой, остальное — JSON
+                multipart = isinstance(data, dict) and any(hasattr(value, 'read') for value in data.values())
+                kwargs = {'content_type': 'application/json'} if data is not None and not multipart else {}
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, data, **kwargs, **self.auth(user))
+                    if response.streaming:
+                        # Выгрузка читает БД, пока отдаёт тело: меряем до последнего байта
+                        b''.join(response.streaming_content)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+                errors += response.status_code >= 400
+            results[name] = self.summarize(timings, queries, errors)
+        return results
+
+    def summarize(self, timings, queries, errors):
+        if not timings:
+            # --requests 0: сценарий не запускался
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'queries': 0, 'errors': errors}
+        if len(timings) > 1:
+            cuts = statistics.quantiles(timings, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = timings[0]
+        return {
+            'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2),
+            'queries': max(queries), 'errors': errors,
+        }
+
+    def report(self, results):
+        header = f'{"сценарий":<24}{"p50":>9}{"p95":>9}{"p99":>9}{"SQL":>6}{"ошибок":>8}'
+        self.stdout.write(header)
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<24}{row["p50"]:>9.2f}{row["p95"]:>9.2f}{row["p99"]:>9.2f}{row["queries"]:>6}{row["errors"]:>8}'
+            )
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, row in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if row['p95'] > base['p95'] * (1 + tolerance):
+                regressions.append(f'{name}: p95 {base["p95"]:.2f} → {row["p95"]:.2f} мс')
+            if row['queries'] > base['queries']:
+                regressions.append(f'{name}: SQL-запросов {base["queries"]} → {row["queries"]}')
+            if row['errors'] > base['errors']:
+                regressions.append(f'{name}: ошибок {base["errors"]} → {row["errors"]}')
+        return regressions
@@ -0,0 +1,154 @@
+import sqlite3
+import statistics
+import tempfile
+import time
+from itertools import combinations
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from apps.listings.models import Listing
+from apps.listings.seed import seed_listings
+from apps.users.models import User
+
+
+# Значения для каждого поля filterset_fields ListingListCreateView
+FILTERS = {
+    'city': {'location__city': 'Бишкек'},
+    'district': {'location__district': 'Октябрьский'},
+    'deal_type': {'deal_type': 'sale'},
+    'price': {'price__gte': 40000, 'price__lte': 90000},
+    'rooms': {'rooms': 2},
+    'area': {'area__gte': 40, 'area__lte': 80},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Планы и задержки запросов ленты объявлений для всех комбинаций filterset_fields. '
+        'С --compare замеряет до (без индексов Listing.Meta.indexes) и после. '
+        'SQLite копируется во временный файл, рабочая база не меняется; '
+        'другие СУБД сидятся и теряют индексы на время замера только с --yes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=1_000_000, help='Досидить базу до этого числа объявлений')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов на запрос')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument(
+            '--ordering', nargs='+', default=['-created_at', 'price', '-likes_count'],
+            help='Сортировки ленты (ordering_fields), для каждой прогоняются все комбинации',
+        )
+        parser.add_argument('--compare', action='store_true', help='Сначала замерить без индексов')
+        parser.add_argument('--plans', action='store_true', help='Печатать EXPLAIN для каждого запроса')
+        parser.add_argument(
+            '--yes', action='store_true',
+            help='Не SQLite: разрешить сид и удаление индексов прямо в базе из настроек',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        if connection.vendor != 'sqlite':
+            if not options['yes']:
+                raise CommandError(
+                    'Бенчмарк досидит базу и пересоздаст индексы Listing: '
+                    'запускайте на копии базы и подтвердите --yes'
+                )
+            self.benchmark()
+            return
+
+        # Как benchmark_sqlite_writes: всё делается на копии, подменённой в настройках соединения
+        database = connections.settings['default']
+        original = database['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'listings.sqlite3'
+            self.copy_database(path)
+            connection.close()
+            database['NAME'] = path
+            try:
+                self.benchmark()
+            finally:
+                connection.close()
+                database['NAME'] = original
+
+    def copy_database(self, path):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def benchmark(self):
+        options = self.options
+        self.seed(options['listings'])
+
+        before = {}
+        if options['compare']:
+            self.set_indexes(enabled=False)
+            try:
+                before = self.run_all('без индексов')
+            finally:
+                self.set_indexes(enabled=True)
+        after = self.run_all('с индексами')
+
+        self.stdout.write('\nкомбинация'.ljust(64) + 'до, мс'.rjust(10) + 'после, мс'.rjust(12))
+        for name, latency in after.items():
+            was = f'{before[name]:.2f}' if name in before else '—'
+            self.stdout.write(f'{name:<63}{was:>10}{latency:>12.2f}')
+
+    def seed(self, target):
+        existing = Listing.objects.count()
+        if existing >= target:
+            return
+        owner, _ = User.objects.get_or_create(username='bench-realtor', defaults={'role': 'realtor'})
+        self.stdout.write(f'Сид: {existing} → {target} объявлений...')
+        seed_listings(target - existing, [owner], seed=existing)
+        self.analyze()
+
+    def analyze(self):
+        # Без свежей статистики планировщик выбирает индексы вслепую
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def set_indexes(self, enabled):
+        with connection.schema_editor() as editor:
+            for index in Listing._meta.indexes:
+                if enabled:
+                    editor.add_index(Listing, index)
+                else:
+                    editor.remove_index(Listing, index)
+        self.analyze()
+
+    def combos(self):
+        for size in range(len(FILTERS) + 1):
+            yield from combinations(FILTERS, size)
+
+    def run_all(self, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+        results = {}
+        for ordering in self.options['ordering']:
+            # Так же, как ListingCursorPagination: поле сортировки + id
+            tie_breaker = '-id' if ordering.startswith('-') else 'id'
+            for combo in self.combos():
+                filters = {}
+                for name in combo:
+                    filters.update(FILTERS[name])
+                queryset = (
+                    Listing.objects.active().filter(**filters)
+                    .order_by(ordering, tie_breaker)[:self.options['page_size']]
+                )
+                name = f'{"+".join(combo) or "(без фильтров)"} | {ordering}'
+                results[name] = self.measure(queryset)
+                if self.options['plans']:
+                    self.stdout.write(f'{name}:\n    ' + queryset.explain().replace('\n', '\n    '))
+        return results
+
+    def measure(self, queryset):
+        timings = []
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,145 @@
+import multiprocessing
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+
+from apps.listings.models import Listing
+
+
+LISTINGS = '/api/v1/listings'
+
+# Режимы соединения: как в DATABASES по умолчанию и SQLITE_TUNED=1
+MODES = {
+    'default': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    'tuned': settings.SQLITE_TUNED_OPTIONS,
+}
+
+
+def write_load(number, deadline, listing_ids):
+    """Один процесс нагрузки: по очереди лайк и заявка до deadline."""
+    client = Client(raise_request_exception=False)
+    timings, errors, step = [], 0, 0
+    try:
+        while time.time() < deadline:
+            step += 1
+            listing_id = listing_ids[(number * 31 + step) % len(listing_ids)]
+            started = time.perf_counter()
+            if step % 2:
+                # У каждого процесса свой набор IP: лайки ставятся и снимаются
+                response = client.post(
+                    f'{LISTINGS}/listings/{listing_id}/like/', REMOTE_ADDR=f'10.{number}.{step % 250}.1',
+                )
+            else:
+                response = client.post(
+                    f'{LISTINGS}/applications/',
+                    {'listing': listing_id, 'contact_phone': '+996555000000', 'message': 'Бенчмарк'},
+                    content_type='application/json',
+                )
+            timings.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 500
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+def read_load(number, deadline):
+    """Процесс-читатель: нефильтрованные по кэшу счётчики фасетов — долгие чтения всей таблицы."""
+    client = Client(raise_request_exception=False)
+    reads = 0
+    try:
+        while time.time() < deadline:
+            client.get(f'{LISTINGS}/listings/facets/?rooms={number % 4 + 1}')
+            reads += 1
+    finally:
+        connections.close_all()
+    return reads
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные лайки и заявки через API на копии SQLite-базы из нескольких процессов '
+        '(как воркеры gunicorn): записей в секунду, задержки и ошибки «database is locked» '
+        'для обычного режима и SQLITE_TUNED. Рабочая база не меняется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Параллельных процессов-писателей')
+        parser.add_argument('--readers', type=int, default=2, help='Параллельных процессов-читателей')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--no-retry', action='store_true', help='Без повторов при блокировке (DB_LOCK_RETRIES=0)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк только для SQLite')
+        self.listing_ids = list(Listing.objects.active().values_list('id', flat=True)[:200])
+        if not self.listing_ids:
+            raise CommandError('Нет объявлений: сначала запустите seed_demo_data')
+
+        database = connections.settings['default']
+        original = {'NAME': database['NAME'], 'OPTIONS': database['OPTIONS']}
+        retries = 0 if options['no_retry'] else settings.DB_LOCK_RETRIES
+        results = {}
+        with tempfile.TemporaryDirectory() as directory, override_settings(DB_LOCK_RETRIES=retries):
+            try:
+                for mode in options['modes']:
+                    path = Path(directory) / f'{mode}.sqlite3'
+                    self.copy_database(path)
+                    connection.close()
+                    database.update({'NAME': path, 'OPTIONS': MODES[mode]})
+                    results[mode] = self.run(options['workers'], options['readers'], options['seconds'])
+                    connection.close()
+                    database.update(original)
+            finally:
+                database.update(original)
+        self.report(results, options['workers'], options['readers'])
+
+    def copy_database(self, path):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    # ─── Прогон ───
+    def run(self, workers, readers, seconds):
+        deadline = time.time() + seconds
+        # fork: дочерние процессы получают уже настроенные settings и пустые соединения
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers + readers) as pool:
+            started = time.perf_counter()
+            reading = pool.starmap_async(read_load, [(number, deadline) for number in range(readers)])
+            results = pool.starmap(write_load, [(number, deadline, self.listing_ids) for number in range(workers)])
+            reads = sum(reading.get())
+            elapsed = time.perf_counter() - started
+
+        timings = [timing for own_timings, _ in results for timing in own_timings]
+        failed = sum(errors for _, errors in results)
+        cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else [timings[0]] * 99
+        return {
+            'writes': len(timings) - failed,
+            'per_second': (len(timings) - failed) / elapsed,
+            'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98],
+            'errors': failed,
+            'reads_per_second': reads / elapsed,
+        }
+
+    def report(self, results, workers, readers):
+        self.stdout.write(f'писателей: {workers}, читателей: {readers}')
+        self.stdout.write(
+            f'{"режим":<10}{"записей":>9}{"в сек":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"ошибок":>8}{"чтений/с":>10}'
+        )
+        for mode, row in results.items():
+            self.stdout.write(
+                f'{mode:<10}{row["writes"]:>9}{row["per_second"]:>9.1f}'
+                f'{row["p50"]:>9.2f}{row["p95"]:>9.2f}{row["p99"]:>9.2f}{row["errors"]:>8}'
+                f'{row["reads_per_second"]:>10.1f}'
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.listings import similar
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие объявления у тех, кого задели изменения после прошлого '
+        'запуска (запускать по cron). Первый запуск и --full — все группы заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать все группы')
+
+    def handle(self, *args, **options):
+        buckets, listings = similar.rebuild() if options['full'] else similar.refresh()
+        self.stdout.write(self.style.SUCCESS(f'Групп: {buckets}, объявлений: {listings}'))
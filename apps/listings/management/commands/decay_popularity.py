@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.listings import popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Затухание счёта популярности объявлений с прошлого запуска (запускать по cron '
+        'раз в 5–15 минут). --rebuild пересчитывает счёт по лайкам и заявкам с нуля.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать по ListingLike и Application')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = popularity.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Пересчитано объявлений: {count}'))
+            return
+        count = popularity.decay()
+        self.stdout.write(self.style.SUCCESS(f'Затухание применено к объявлениям: {count}'))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.listings.images import ImagePipeline
+from apps.listings.models import ListingImage
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает фото в очереди (pending): конвертация в WEBP пулом процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Число процессов Pillow')
+        parser.add_argument('--loop', action='store_true', help='Не завершаться, опрашивать очередь')
+        parser.add_argument('--interval', type=float, default=5.0, help='Пауза между опросами, сек')
+        parser.add_argument(
+            '--reset-stuck', action='store_true',
+            help='Вернуть в очередь фото, зависшие в processing после падения воркера',
+        )
+        parser.add_argument(
+            '--rebuild-variants', action='store_true',
+            help='Поставить в очередь готовые фото, для которых ещё не нарезаны размеры',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset_stuck']:
+            reset = ListingImage.objects.filter(status=ListingImage.STATUS_PROCESSING).update(
+                status=ListingImage.STATUS_PENDING
+            )
+            self.stdout.write(f'Возвращено в очередь: {reset}')
+        if options['rebuild_variants']:
+            queued = ListingImage.objects.filter(status=ListingImage.STATUS_READY, variants={}).update(
+                status=ListingImage.STATUS_PENDING
+            )
+            self.stdout.write(f'Поставлено на нарезку размеров: {queued}')
+
+        pipeline = ImagePipeline(options['workers'])
+        try:
+            while True:
+                pending = list(
+                    ListingImage.objects.filter(status=ListingImage.STATUS_PENDING)
+                    .order_by('id').values_list('id', flat=True)
+                )
+                futures = [pipeline.submit(image_id) for image_id in pending]
+                done = sum(1 for future in futures if future.result())
+                if pending:
+                    self.stdout.write(self.style.SUCCESS(f'Обработано фото: {done} из {len(pending)}'))
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            pipeline.shutdown()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from apps.listings.models import Application, DailyStats, Listing, ListingLike
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает дневную статистику по сырым таблицам (создание объявлений, заявки, лайки). '
+        'Снятия с публикации не восстанавливаются — у объявления нет даты деактивации.'
+    )
+
+    def handle(self, *args, **options):
+        sources = {
+            'listings_created': Listing.objects.all(),
+            'applications': Application.objects.all(),
+            'likes': ListingLike.objects.all(),
+        }
+        rows = {}
+        for field, queryset in sources.items():
+            per_day = (
+                queryset.order_by().annotate(day=TruncDate('created_at'))
+                .values('day').annotate(total=Count('id')).values_list('day', 'total')
+            )
+            for day, total in per_day:
+                rows.setdefault(day, {})[field] = total
+
+        with transaction.atomic():
+            DailyStats.objects.update(listings_created=0, applications=0, likes=0)
+            for day, counters in rows.items():
+                DailyStats.objects.update_or_create(date=day, defaults=counters)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано дней: {len(rows)}'))
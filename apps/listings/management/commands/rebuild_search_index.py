@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.listings import search
+from apps.listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс объявлений'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.get_backend().clear()
+            search.reindex(Listing.objects.filter(is_active=True))
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from apps.listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Listing.likes_count с таблицей ListingLike и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = (
+                Listing.objects.with_actual_likes_count()
+                .exclude(likes_count=F('actual_likes_count'))
+                .values_list('pk', 'likes_count', 'actual_likes_count')
+            )
+            for pk, stored, actual in drifted:
+                self.stdout.write(f'#{pk}: {stored} → {actual}')
+            return
+
+        fixed = Listing.objects.sync_likes_count()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено объявлений: {fixed}'))
@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from apps.listings import seed
+from apps.listings.models import Listing
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетические данные: пользователи, локации, объявления с фото, лайки, заявки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--realtors', type=int, default=20)
+        parser.add_argument('--admins', type=int, default=2)
+        parser.add_argument('--listings', type=int, default=10_000)
+        parser.add_argument('--images-per-listing', type=int, default=3)
+        parser.add_argument('--likes', type=int, default=50_000)
+        parser.add_argument('--applications', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генератора — данные воспроизводимы')
+
+    def handle(self, *args, **options):
+        users = seed.seed_users(options['realtors'], options['admins'])
+        realtors = [user for user in users if user.role == 'realtor']
+        self.stdout.write(f'Пользователей: {len(users)}')
+
+        existing = set(Listing.objects.values_list('id', flat=True))
+        seed.seed_listings(options['listings'], realtors, seed=options['seed'])
+        listing_ids = sorted(set(Listing.objects.values_list('id', flat=True)) - existing)
+        self.stdout.write(f'Объявлений: {len(listing_ids)}')
+
+        if listing_ids:
+            images = seed.seed_images(listing_ids, options['images_per_listing'], seed=options['seed'])
+            likes = seed.seed_likes(listing_ids, options['likes'], seed=options['seed'])
+            applications = seed.seed_applications(listing_ids, users, options['applications'], seed=options['seed'])
+            self.stdout.write(f'Фото: {images}, лайков: {likes}, заявок: {applications}')
+
+        # bulk_create обходит сигналы — индекс и статистику строим целиком
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('rebuild_daily_stats', stdout=self.stdout)
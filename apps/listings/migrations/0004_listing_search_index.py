@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE listings_search USING fts5(
+    title, description, address,
+    tokenize = 'unicode61 remove_diacritics 0'
+)
+"""
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE listings_search (
+        listing_id bigint PRIMARY KEY REFERENCES listings_listing (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX listings_search_document_gin ON listings_search USING GIN (document)',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+    else:
+        return
+
+    from apps.listings.search import BACKENDS
+
+    Listing = apps.get_model('listings', 'Listing')
+    backend = BACKENDS[vendor](Listing._meta.db_table)
+    for listing in Listing.objects.filter(is_active=True).iterator():
+        backend.index(listing)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS listings_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_alter_application_user_listinglike_delete_favorite'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
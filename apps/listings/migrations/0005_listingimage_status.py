@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Старые фото конвертировались синхронно в ListingImage.save()
+    ListingImage = apps.get_model('listings', 'ListingImage')
+    ListingImage.objects.update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='processing_error',
+            field=models.TextField(blank=True, verbose_name='Ошибка обработки'),
+        ),
+        migrations.AddField(
+            model_name='listingimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус обработки'),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_listingimage_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Размеры'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    ListingLike = apps.get_model('listings', 'ListingLike')
+    actual = (
+        ListingLike.objects.filter(listing=OuterRef('pk'))
+        .values('listing').annotate(total=Count('pk')).values('total')
+    )
+    Listing.objects.update(likes_count=Coalesce(Subquery(actual), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_listingimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Лайков'),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_listing_likes_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Дата')),
+                ('listings_created', models.PositiveIntegerField(default=0, verbose_name='Создано объявлений')),
+                ('listings_deactivated', models.PositiveIntegerField(default=0, verbose_name='Снято с публикации')),
+                ('applications', models.PositiveIntegerField(default=0, verbose_name='Заявок')),
+                ('likes', models.PositiveIntegerField(default=0, verbose_name='Лайков')),
+            ],
+            options={
+                'verbose_name': 'Статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_listing_geo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Внешний ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='listing',
+            constraint=models.UniqueConstraint(fields=('owner', 'external_id'), name='listing_owner_external_id_uniq'),
+        ),
+    ]
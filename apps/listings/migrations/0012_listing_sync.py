@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def fill_change_seq(apps, schema_editor):
+    # Существующие объявления нумеруются по id, счётчик продолжает с максимума
+    Listing = apps.get_model('listings', 'Listing')
+    ChangeCounter = apps.get_model('listings', 'ChangeCounter')
+    Listing.objects.update(change_seq=F('id'), updated_at=F('created_at'))
+    last = Listing.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeCounter.objects.create(name='listings', value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listing_external_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Имя')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик изменений',
+                'verbose_name_plural': 'Счётчики изменений',
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_id', models.BigIntegerField(unique=True, verbose_name='ID объявления')),
+                ('change_seq', models.BigIntegerField(verbose_name='Номер изменения')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённое объявление',
+                'verbose_name_plural': 'Удалённые объявления',
+            },
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Номер изменения'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['change_seq', 'id'], name='listing_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listingtombstone',
+            index=models.Index(fields=['change_seq', 'listing_id'], name='tombstone_change_seq_idx'),
+        ),
+        migrations.RunPython(fill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarListings',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similar', serialize=False, to='listings.listing', verbose_name='Объявление')),
+                ('bucket', models.CharField(db_index=True, max_length=40, verbose_name='Группа')),
+                ('neighbor_ids', models.JSONField(default=list, verbose_name='Похожие')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Похожие объявления',
+                'verbose_name_plural': 'Похожие объявления',
+            },
+        ),
+    ]
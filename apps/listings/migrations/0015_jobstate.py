@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:02
+
+from django.db import migrations, models
+
+
+def move_popularity_clock(apps, schema_editor):
+    # Отметка затухания популярности жила строкой ChangeCounter
+    ChangeCounter = apps.get_model('listings', 'ChangeCounter')
+    JobState = apps.get_model('listings', 'JobState')
+    for row in ChangeCounter.objects.filter(name='popularity_decayed_at'):
+        JobState.objects.create(name=row.name, value=row.value)
+        row.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_similarlistings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Задача')),
+                ('value', models.BigIntegerField(verbose_name='Значение')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Состояние фоновой задачи',
+                'verbose_name_plural': 'Состояния фоновых задач',
+            },
+        ),
+        migrations.RunPython(move_popularity_clock, migrations.RunPython.noop),
+    ]
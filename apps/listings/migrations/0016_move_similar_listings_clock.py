@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:02
+
+from django.db import migrations
+
+
+def move_similar_listings_clock(apps, schema_editor):
+    # Позиция пересчёта похожих объявлений жила строкой ChangeCounter
+    ChangeCounter = apps.get_model('listings', 'ChangeCounter')
+    JobState = apps.get_model('listings', 'JobState')
+    for row in ChangeCounter.objects.filter(name='similar_listings_seq'):
+        JobState.objects.create(name=row.name, value=row.value)
+        row.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_jobstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_similar_listings_clock, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
-from django.db import models
+import math
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Substr
+from django.utils import timezone
 from django.conf import settings
-from PIL import Image
-from io import BytesIO
-from django.core.files.base import ContentFile
-import os
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+from . import geo
 
 
 # ───── Локация ─────
@@ -21,6 +24,89 @@ class Location(models.Model):
 
 
 # ───── Объявление ─────
+class ListingQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+    def for_api(self, location=True, images=True):
+        """Всё, что читает ListingSerializer, загружается заранее: без N+1 на странице."""
+        queryset = self
+        if location:
+            queryset = queryset.select_related('location')
+        if images:
+            queryset = queryset.prefetch_related(
+                models.Prefetch('images', queryset=ListingImage.objects.order_by('id'))
+            )
+        return queryset
+
+    def touch(self, **fields):
+        """update() с новым номером изменения — чтобы правка дошла до клиентов /listings/sync/."""
+        with transaction.atomic():
+            return self.update(
+                change_seq=ChangeCounter.next(Listing.SYNC_COUNTER),
+                updated_at=timezone.now(),
+                **fields,
+            )
+
+    def in_bbox(self, bbox):
+        """bbox = (min_lat, min_lng, max_lat, max_lng). Ячейки геохэша отсекают по индексу, точные границы — после."""
+        cells = models.Q()
+        for prefix in geo.cover(bbox):
+            low, high = geo.prefix_range(prefix)
+            cells |= models.Q(geohash__gte=low, geohash__lt=high)
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return self.filter(cells).filter(
+            latitude__gte=min_lat, latitude__lte=max_lat,
+            longitude__gte=min_lng, longitude__lte=max_lng,
+        )
+
+    def within_radius(self, lat, lng, radius_km):
+        # Равнопромежуточная проекция: на радиусах в пределах города ошибка меньше процента
+        scale = math.cos(math.radians(lat)) ** 2
+        dlat = models.F('latitude') - lat
+        dlng = models.F('longitude') - lng
+        distance = models.ExpressionWrapper(dlat * dlat + dlng * dlng * scale, output_field=models.FloatField())
+        limit = math.degrees(radius_km / geo.EARTH_RADIUS_KM) ** 2
+        return self.in_bbox(geo.radius_bbox(lat, lng, radius_km)).alias(
+            geo_distance=distance
+        ).filter(geo_distance__lte=limit)
+
+    def clusters(self, precision):
+        """Маркеры карты: число объявлений и их центр в каждой ячейке геохэша заданной точности."""
+        return (
+            self.exclude(geohash='').order_by()
+            .annotate(cell=Substr('geohash', 1, precision))
+            .values('cell')
+            .annotate(
+                count=models.Count('id'),
+                latitude=models.Avg('latitude'),
+                longitude=models.Avg('longitude'),
+                listing_id=models.Min('id'),
+            )
+            .order_by('cell')
+        )
+
+    def with_actual_likes_count(self):
+        return self.annotate(actual_likes_count=models.Count('likes'))
+
+    def sync_likes_count(self):
+        """Пересчитывает денормализованный likes_count по ListingLike. Возвращает число исправленных строк."""
+        drifted = list(
+            self.with_actual_likes_count()
+            .exclude(likes_count=models.F('actual_likes_count'))
+            .values_list('pk', flat=True)
+        )
+        if not drifted:
+            return 0
+        actual = (
+            ListingLike.objects.filter(listing=models.OuterRef('pk'))
+            .values('listing').annotate(total=models.Count('pk')).values('total')
+        )
+        return Listing.objects.filter(pk__in=drifted).update(
+            likes_count=Coalesce(models.Subquery(actual), 0)
+        )
+
+
 class Listing(models.Model):
     DEAL_TYPE_CHOICES = [
         ('sale', 'Продажа'),
@@ -48,18 +134,114 @@ class Listing(models.Model):
     deal_type = models.CharField("Тип сделки", max_length=10, choices=DEAL_TYPE_CHOICES)
     is_active = models.BooleanField("Активно", default=True)
     created_at = models.DateTimeField("Дата создания", auto_now_add=True)
+    # Денормализованный счётчик: меняется F-выражением в ListingLikeToggleView,
+    # расхождения чинит команда reconcile_likes_count
+    likes_count = models.PositiveIntegerField("Лайков", default=0, editable=False)
+    # Затухающий счёт недавних лайков и заявок (popularity.py): растёт по событиям,
+    # уменьшается командой decay_popularity
+    popularity = models.FloatField("Популярность", default=0, editable=False)
+    latitude = models.FloatField(
+        "Широта", null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        "Долгота", null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    # Геохэш координат: поиск по карте идёт диапазонами по его индексу (см. geo.py)
+    geohash = models.CharField("Геохэш", max_length=12, blank=True, editable=False)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    # Номер последнего изменения (ChangeCounter 'listings'): курсор /listings/sync/
+    change_seq = models.BigIntegerField("Номер изменения", default=0, editable=False)
+    # ID объявления в фиде партнёра: по нему импорт обновляет уже загруженные строки
+    external_id = models.CharField("Внешний ID", max_length=100, null=True, blank=True)
+
+    objects = ListingQuerySet.as_manager()
+
+    SYNC_COUNTER = 'listings'
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Объявление"
         verbose_name_plural = "Объявления"
+        # Частичные индексы по активным объявлениям. Лента по умолчанию идёт по -created_at,
+        # поэтому равенства (deal_type, location) стоят перед датой, а диапазоны цены/площади
+        # проверяются по ходу индекса. id в хвосте — тай-брейкер ListingCursorPagination.
+        # Индексов с ведущими price/area/rooms нет: без гистограмм SQLite считает диапазон
+        # цены селективным, берёт такой индекс вместо индекса сортировки и сортирует
+        # половину таблицы (см. benchmark_listing_indexes).
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True), name='listing_active_created_idx',
+            ),
+            models.Index(
+                fields=['deal_type', '-created_at', '-id'],
+                condition=models.Q(is_active=True), name='listing_active_deal_idx',
+            ),
+            models.Index(
+                fields=['location', '-created_at', '-id'],
+                condition=models.Q(is_active=True), name='listing_active_loc_idx',
+            ),
+            models.Index(
+                fields=['-likes_count', '-id'],
+                condition=models.Q(is_active=True), name='listing_active_likes_idx',
+            ),
+            models.Index(
+                fields=['-popularity', '-id'],
+                condition=models.Q(is_active=True), name='listing_active_popular_idx',
+            ),
+            # Без условия: SQLite не применяет частичные индексы к OR нескольких
+            # диапазонов (MULTI-INDEX OR), а именно так выглядит поиск по bbox
+            models.Index(fields=['geohash'], name='listing_geohash_idx'),
+            models.Index(fields=['change_seq', 'id'], name='listing_change_seq_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'external_id'], name='listing_owner_external_id_uniq'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Нужен сигналам, чтобы поймать момент снятия с публикации
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
 
     def __str__(self):
         return f"{self.title} ({self.get_deal_type_display()})"
 
+    def update_geohash(self):
+        has_point = self.latitude is not None and self.longitude is not None
+        self.geohash = geo.encode(self.latitude, self.longitude) if has_point else ''
+
+    def save(self, *args, **kwargs):
+        self.update_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = {'change_seq', 'updated_at'}
+            if {'latitude', 'longitude'} & set(update_fields):
+                extra.add('geohash')
+            kwargs['update_fields'] = {*update_fields, *extra}
+        # Номер берётся в той же транзакции, что и запись: блокировка счётчика
+        # держится до коммита, поэтому номера фиксируются строго по порядку
+        with transaction.atomic():
+            self.change_seq = ChangeCounter.next(self.SYNC_COUNTER)
+            super().save(*args, **kwargs)
+
 
 # ───── Фото ─────
 class ListingImage(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_PROCESSING, 'Обрабатывается'),
+        (STATUS_READY, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
     listing = models.ForeignKey(
         Listing,
         on_delete=models.CASCADE,
@@ -67,23 +249,35 @@ class ListingImage(models.Model):
         verbose_name="Объявление"
     )
     image = models.ImageField("Изображение", upload_to='listing_images/')
+    status = models.CharField("Статус обработки", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    processing_error = models.TextField("Ошибка обработки", blank=True)
+    # {'source': имя файла, из которого нарезаны размеры, 'sizes': {'320': имя файла, ...}}
+    variants = models.JSONField("Размеры", default=dict, blank=True)
 
     class Meta:
         verbose_name = "Фото квартиры"
         verbose_name_plural = "Фотографии квартиры"
 
     def save(self, *args, **kwargs):
-        if self.image and not self.image.name.lower().endswith('.webp'):
-            img = Image.open(self.image)
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            output = BytesIO()
-            img.save(output, format='WEBP', quality=75)
-            output.seek(0)
-            webp_name = os.path.splitext(self.image.name)[0] + '.webp'
-            self.image = ContentFile(output.read(), name=webp_name)
+        # Конвертация в WEBP и нарезка размеров идут в фоне (apps.listings.images),
+        # здесь файл сохраняется как есть. Повторно обрабатываем только новый исходник —
+        # даже если старый ещё в работе: воркер увидит замену и свой результат выбросит
+        needs_processing = bool(self.image) and self.variants.get('source') != self.image.name
+        if needs_processing:
+            self.status = self.STATUS_PENDING
+            self.processing_error = ''
         super().save(*args, **kwargs)
 
+        if self.status == self.STATUS_PENDING:
+            from .images import enqueue
+            transaction.on_commit(lambda: enqueue(self.pk))
+
+    @property
+    def variant_names(self):
+        """Имена файлов размеров по возрастанию ширины: [(320, name), ...]"""
+        sizes = self.variants.get('sizes', {})
+        return sorted((int(width), name) for width, name in sizes.items())
+
     def __str__(self):
         return f"Фото → {self.listing.title}"
 
@@ -136,3 +330,125 @@ class ListingLike(models.Model):
 
     def __str__(self):
         return f"{self.ip_address} ❤️ {self.listing.title}"
+
+
+# ───── Дневная статистика ─────
+class DailyStats(models.Model):
+    """Счётчики за день, обновляются по событиям — дашборд не сканирует сырые таблицы."""
+    date = models.DateField("Дата", unique=True)
+    listings_created = models.PositiveIntegerField("Создано объявлений", default=0)
+    listings_deactivated = models.PositiveIntegerField("Снято с публикации", default=0)
+    applications = models.PositiveIntegerField("Заявок", default=0)
+    likes = models.PositiveIntegerField("Лайков", default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+
+    def __str__(self):
+        return f"Статистика за {self.date}"
+
+    @classmethod
+    def bump(cls, day=None, **deltas):
+        day = day or timezone.localdate()
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if cls.objects.filter(date=day).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(date=day, **deltas)
+        except IntegrityError:
+            # Строку за этот день только что создал параллельный запрос
+            cls.objects.filter(date=day).update(**changes)
+
+
+# ───── Синхронизация ─────
+class ChangeCounter(models.Model):
+    """Монотонные счётчики изменений (по имени). Номер выдаётся внутри транзакции записи."""
+    name = models.CharField("Имя", max_length=50, unique=True)
+    value = models.BigIntegerField("Значение", default=0)
+
+    class Meta:
+        verbose_name = "Счётчик изменений"
+        verbose_name_plural = "Счётчики изменений"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def next(cls, name):
+        # UPDATE блокирует строку до конца внешней транзакции: параллельная запись
+        # ждёт, и меньший номер никогда не закоммитится позже большего
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(value=models.F('value') + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, value=1)
+                except IntegrityError:
+                    cls.objects.filter(name=name).update(value=models.F('value') + 1)
+            return cls.objects.filter(name=name).values_list('value', flat=True).get()
+
+
+# ───── Состояние фоновых задач ─────
+class JobState(models.Model):
+    """
+    Отметка периодической задачи (по имени): когда она последний раз отработала
+    или до какого номера изменения дошла. Не путать с ChangeCounter.
+    """
+    name = models.CharField("Задача", max_length=50, unique=True)
+    value = models.BigIntegerField("Значение")
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Состояние фоновой задачи"
+        verbose_name_plural = "Состояния фоновых задач"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def read(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first()
+
+    @classmethod
+    def write(cls, name, value):
+        cls.objects.update_or_create(name=name, defaults={'value': value})
+
+
+class ListingTombstone(models.Model):
+    """След удалённого из базы объявления: мобильный клиент узнаёт о нём через /listings/sync/."""
+    listing_id = models.BigIntegerField("ID объявления", unique=True)
+    change_seq = models.BigIntegerField("Номер изменения")
+    deleted_at = models.DateTimeField("Дата удаления", auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['change_seq', 'listing_id'], name='tombstone_change_seq_idx')]
+        verbose_name = "Удалённое объявление"
+        verbose_name_plural = "Удалённые объявления"
+
+    def __str__(self):
+        return f"Удалено объявление #{self.listing_id}"
+
+
+# ───── Похожие объявления ─────
+class SimilarListings(models.Model):
+    """Заранее посчитанные ближайшие соседи объявления (similar.py), в порядке близости."""
+    listing = models.OneToOneField(
+        Listing,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similar',
+        verbose_name="Объявление"
+    )
+    # Группа «тип сделки:локация», в которой искались соседи
+    bucket = models.CharField("Группа", max_length=40, db_index=True)
+    neighbor_ids = models.JSONField("Похожие", default=list)
+    updated_at = models.DateTimeField("Дата расчёта", auto_now=True)
+
+    class Meta:
+        verbose_name = "Похожие объявления"
+        verbose_name_plural = "Похожие объявления"
+
+    def __str__(self):
+        return f"Похожие на #{self.listing_id}"
@@ -0,0 +1,142 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ───── Keyset-пагинация ленты объявлений ─────
+class ListingCursorPagination(BasePagination):
+    """
+    Курсор хранит (значение поля сортировки, id) последней строки страницы,
+    поэтому страница N выбирается через WHERE по ключу, а не OFFSET.
+    id — стабильный тай-брейкер для одинаковых цен/площадей/лайков.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        field, descending = self.ordering.lstrip('-'), self.ordering.startswith('-')
+
+        cursor = self.decode_cursor(request, self.sort_field(queryset, field))
+        reverse = bool(cursor and cursor['r'])
+        # Для предыдущей страницы идём от курсора в обратную сторону
+        step_back = descending != reverse
+        sign = '-' if step_back else ''
+        queryset = queryset.order_by(f'{sign}{field}', f'{sign}id')
+
+        if cursor is not None:
+            lookup = 'lt' if step_back else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': cursor['v']})
+                | Q(**{field: cursor['v'], f'id__{lookup}': cursor['id']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.field = field
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        # Берём сортировку из OrderingFilter вьюхи; ключом служит первое поле
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        return self.default_ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            'o': self.ordering,
+            'v': str(getattr(row, self.field)),
+            'id': row.pk,
+            'r': int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def sort_field(self, queryset, name):
+        # Сортировка по релевантности идёт по аннотации search_rank, остальные — по полям модели
+        annotation = queryset.query.annotations.get(name)
+        return annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, request, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            # Значение приводится к типу поля здесь: мусор в курсоре — 404, а не 500 из БД
+            value = field.to_python(payload['v'])
+            if value is None:
+                raise ValueError
+            cursor = {'v': value, 'id': int(payload['id']), 'r': bool(payload['r'])}
+            ordering = payload['o']
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        # Курсор от другой сортировки не имеет смысла
+        if ordering != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Application, JobState, Listing, ListingLike
+
+
+# ───── Популярность: затухающий счёт ─────
+# Listing.popularity — сумма весов недавних событий (лайк, заявка), каждый вес
+# вдвое меньше через POPULARITY_HALF_LIFE_HOURS. Событие прибавляет вес одним
+# UPDATE, а decay_popularity раз в несколько минут умножает все ненулевые счета
+# на 2^(-прошедшее/полураспад). Умножение не меняет порядок, поэтому лента
+# сортируется по индексу, без агрегации лайков и заявок на каждый запрос.
+
+# Время последнего затухания (unix-секунды) хранится строкой JobState
+CLOCK = 'popularity_decayed_at'
+# Меньшие счета обнуляются: в индексе остаются только недавно активные объявления
+MIN_SCORE = 0.01
+
+
+def weight(event):
+    return settings.POPULARITY_WEIGHTS[event]
+
+
+def delta(event):
+    """Выражение для update(popularity=...): новое событие прибавляет полный вес."""
+    return F('popularity') + weight(event)
+
+
+def withdraw(event, created_at):
+    """
+    Выражение для отмены события (снятый лайк): вычитается то, что от его веса
+    осталось в счёте после затуханий с created_at, — не ниже нуля.
+    """
+    decayed_at = last_decay()
+    age = 0 if decayed_at is None else max(decayed_at - created_at.timestamp(), 0)
+    return Greatest(F('popularity') - weight(event) * decay_factor(age), 0.0)
+
+
+def bump(listing_id, event):
+    Listing.objects.filter(pk=listing_id).update(popularity=delta(event))
+
+
+def decay_factor(seconds):
+    return 0.5 ** (seconds / (settings.POPULARITY_HALF_LIFE_HOURS * 3600))
+
+
+def last_decay():
+    return JobState.read(CLOCK)
+
+
+def set_clock(now):
+    JobState.write(CLOCK, int(now))
+
+
+def decay(now=None):
+    """Затухание с прошлого запуска. Первый запуск только ставит отметку времени."""
+    now = now or time.time()
+    with transaction.atomic():
+        previous = last_decay()
+        set_clock(now)
+        if previous is None or now <= previous:
+            return 0
+        factor = decay_factor(now - previous)
+        Listing.objects.filter(popularity__gt=0, popularity__lt=MIN_SCORE / factor).update(popularity=0)
+        return Listing.objects.filter(popularity__gt=0).update(popularity=F('popularity') * factor)
+
+
+def rebuild():
+    """
+    Пересчёт с нуля по ListingLike.created_at и Application.created_at — для первого
+    запуска и после смены весов. События старше 20 полураспадов не учитываются.
+    """
+    moment = timezone.now()
+    since = moment - timedelta(hours=settings.POPULARITY_HALF_LIFE_HOURS * 20)
+    scores = {}
+    for event, model in (('like', ListingLike), ('application', Application)):
+        rows = model.objects.filter(created_at__gte=since).values_list('listing_id', 'created_at')
+        for listing_id, created_at in rows.iterator(chunk_size=5000):
+            age = max((moment - created_at).total_seconds(), 0)
+            scores[listing_id] = scores.get(listing_id, 0) + weight(event) * decay_factor(age)
+
+    with transaction.atomic():
+        Listing.objects.filter(popularity__gt=0).update(popularity=0)
+        Listing.objects.bulk_update(
+            [Listing(pk=pk, popularity=score) for pk, score in scores.items() if score >= MIN_SCORE],
+            ['popularity'], batch_size=500,
+        )
+        set_clock(moment.timestamp())
+    return len(scores)
@@ -0,0 +1,166 @@
+import hashlib
+import time
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from core import replicas
+from . import conditional
+
+
+# ───── Кэш ответов для анонимной выдачи ─────
+# Ключ ответа включает номера поколений его зависимостей («listings», «locations»).
+# Сигнал сохранения/удаления увеличивает поколение — старые ключи просто перестают
+# читаться и вытесняются по TTL, без сброса всего кэша.
+
+NAMESPACES = ('listings', 'locations')
+# Пространства, для которых считаются попадания/промахи
+METRIC_NAMESPACES = NAMESPACES + ('facets',)
+# Регистр не важен для поиска, а значит и для ключа
+CASE_INSENSITIVE_PARAMS = ('search',)
+# Списки через запятую, где порядок не важен (fieldsets.py)
+UNORDERED_LIST_PARAMS = ('fields', 'omit')
+# Числовые фильтры ленты (price__gte, area__lte, rooms): 50000 и 50000.0 — одно и то же.
+# Остальные параметры (page_size, cursor, ...) в ключ идут как есть
+NUMERIC_FILTER_FIELDS = ('price', 'area', 'rooms')
+
+
+def generation_key(namespace):
+    return f'resp:gen:{namespace}'
+
+
+def metric_key(namespace, metric):
+    return f'resp:metrics:{namespace}:{metric}'
+
+
+def get_generations(namespaces):
+    keys = [generation_key(namespace) for namespace in namespaces]
+    values = cache.get_many(keys)
+    return [values.get(key, 0) for key in keys]
+
+
+def incr(key):
+    # add() не перезапишет уже существующий счётчик
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def fresh_key(namespace):
+    return f'resp:fresh:{namespace}'
+
+
+def invalidate(*namespaces):
+    for namespace in namespaces:
+        incr(generation_key(namespace))
+        if settings.DATABASE_REPLICAS:
+            cache.set(fresh_key(namespace), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def fill_source(namespaces):
+    """
+    Сразу после изменения реплика может ещё отдавать старые данные, а кэш
+    запомнил бы их под новым поколением на весь TTL — такие промахи читают primary.
+    """
+    if settings.DATABASE_REPLICAS and cache.get_many([fresh_key(namespace) for namespace in namespaces]):
+        return replicas.primary()
+    return nullcontext()
+
+
+def canonical_value(key, value):
+    value = value.strip()
+    if key in CASE_INSENSITIVE_PARAMS:
+        return ' '.join(value.lower().split())
+    if key in UNORDERED_LIST_PARAMS:
+        return ','.join(sorted({name.strip() for name in value.split(',') if name.strip()}))
+    if key.split('__')[0] not in NUMERIC_FILTER_FIELDS:
+        return value
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return value
+    # 50000, 50000.0 и 5E+4 — один и тот же фильтр
+    return format(number.normalize(), 'f') if number.is_finite() else value
+
+
+def normalize_query(query_params):
+    items = []
+    for key in sorted(query_params):
+        values = sorted(canonical_value(key, value) for value in query_params.getlist(key))
+        items += [(key, value) for value in values if value]
+    return urlencode(items)
+
+
+def make_key(request, namespaces):
+    generations = '.'.join(str(generation) for generation in get_generations(namespaces))
+    raw = f'{request.get_host()}{request.path}?{normalize_query(request.query_params)}'
+    return f'resp:{"+".join(namespaces)}:{generations}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def is_cacheable(request):
+    if request.method != 'GET':
+        return False
+    user = request.user
+    # У администраторов своя выдача (включая неактивные объявления)
+    return not (user.is_authenticated and (user.role == 'admin' or user.is_staff))
+
+
+def record(namespace, metric):
+    incr(metric_key(namespace, metric))
+
+
+def metrics():
+    keys = {
+        (namespace, metric): metric_key(namespace, metric)
+        for namespace in METRIC_NAMESPACES for metric in ('hits', 'misses')
+    }
+    values = cache.get_many(keys.values())
+    data = {}
+    for (namespace, metric), key in keys.items():
+        data.setdefault(namespace, {})[metric] = values.get(key, 0)
+    return data
+
+
+class CachedListMixin:
+    """
+    Кэширует ответ list() для анонимов и обычных пользователей. Вместе с данными
+    хранится ETag и время заполнения — условный GET отвечает 304 без БД и сериализации.
+    """
+    cache_namespace = None
+    cache_depends_on = ()
+
+    def list(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return conditional.apply_headers(request, super().list(request, *args, **kwargs))
+
+        key = make_key(request, self.cache_depends_on)
+        entry = cache.get(key)
+        # (data, etag, modified); записи старого формата считаем промахом
+        if isinstance(entry, tuple):
+            record(self.cache_namespace, 'hits')
+            data, etag, modified = entry
+            response = conditional.not_modified(request, etag, modified) or Response(data)
+            response['X-Cache'] = 'HIT'
+            return conditional.apply_headers(request, response, etag, modified)
+
+        with fill_source(self.cache_depends_on):
+            response = super().list(request, *args, **kwargs)
+        record(self.cache_namespace, 'misses')
+        response['X-Cache'] = 'MISS'
+        if response.status_code != 200:
+            return response
+        etag, modified = conditional.data_etag(response.data), int(time.time())
+        cache.set(key, (response.data, etag, modified), settings.RESPONSE_CACHE_TTL)
+        # Те же данные могли уже лежать у клиента (другой процесс, прошлое поколение)
+        unchanged = conditional.not_modified(request, etag)
+        if unchanged is not None:
+            unchanged['X-Cache'] = 'MISS'
+            response = unchanged
+        return conditional.apply_headers(request, response, etag, modified)
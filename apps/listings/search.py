@@ -0,0 +1,226 @@
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+
+# ───── Токенизация и морфология (русский / кыргызский) ─────
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+MIN_STEM_LENGTH = 3
+
+RUSSIAN_SUFFIXES = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ого', 'его', 'ому', 'ему',
+    'ыми', 'ими', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой', 'ей', 'ий', 'ый', 'ую',
+    'юю', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+# Кыргызские аффиксы с учётом гармонии гласных: множественное число (-лар/-лөр...)
+# и падежи (-дын, -дан, -га, -да...)
+KYRGYZ_PLURAL = tuple(f'{consonant}{vowel}р' for consonant in 'лдт' for vowel in 'аеоө')
+KYRGYZ_CASES = tuple(
+    f'{consonant}{vowel}н' for consonant in 'дтн' for vowel in 'аеоөыиуү'
+) + tuple(
+    f'{consonant}{vowel}' for consonant in 'гкдт' for vowel in 'аеоө'
+)
+SUFFIXES = sorted(set(RUSSIAN_SUFFIXES + KYRGYZ_PLURAL + KYRGYZ_CASES), key=len, reverse=True)
+
+
+def strip_suffix(word, suffixes):
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def stem(word):
+    stemmed = strip_suffix(word, SUFFIXES)
+    # Кыргызский падеж стоит после множественного числа: үй-лөр-дө
+    if stemmed != word:
+        stemmed = strip_suffix(stemmed, KYRGYZ_PLURAL)
+    return stemmed
+
+
+def words(text):
+    # Однобуквенные предлоги и союзы («в», «и», «с») в индекс не попадают
+    found = WORD_RE.findall((text or '').lower().replace('ё', 'е'))
+    return [word for word in found if len(word) > 1 or word.isdigit()]
+
+
+def tokenize(text):
+    return [word if word.isdigit() else stem(word) for word in words(text)]
+
+
+def index_terms(text):
+    # Храним и основу, и словоформу: префиксный поиск по основе запроса
+    # находит слово, даже если стеммер обрезал его по-другому
+    terms = []
+    for word in words(text):
+        terms.append(word)
+        stemmed = stem(word)
+        if stemmed != word:
+            terms.append(stemmed)
+    return ' '.join(terms)
+
+
+def document(listing):
+    return {
+        'title': index_terms(listing.title),
+        'description': index_terms(listing.description),
+        'address': index_terms(listing.address),
+    }
+
+
+# ───── Бэкенды ─────
+class SearchBackend:
+    table = 'listings_search'
+
+    def __init__(self, listing_table):
+        self.listing_table = listing_table
+
+    def index(self, listing):
+        raise NotImplementedError
+
+    def remove(self, listing_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def build_query(self, tokens):
+        raise NotImplementedError
+
+    def match_sql(self):
+        raise NotImplementedError
+
+    def rank_sql(self):
+        raise NotImplementedError
+
+    def matching(self, queryset, text):
+        """Только фильтр по индексу, без ранжирования (для агрегатов)."""
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset
+        return queryset.filter(id__in=RawSQL(self.match_sql(), [self.build_query(tokens)]))
+
+    def search(self, queryset, text):
+        """Фильтрует queryset по индексу и добавляет аннотацию search_rank (больше — релевантнее)."""
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset
+        query = self.build_query(tokens)
+        return self.matching(queryset, text).annotate(
+            search_rank=RawSQL(self.rank_sql(), [query], output_field=FloatField())
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    # Веса bm25 по колонкам: title, description, address
+    weights = (10.0, 1.0, 4.0)
+
+    def index(self, listing):
+        doc = document(listing)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [listing.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description, address) VALUES (%s, %s, %s, %s)',
+                [listing.pk, doc['title'], doc['description'], doc['address']],
+            )
+
+    def remove(self, listing_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [[pk] for pk in listing_ids])
+
+    def build_query(self, tokens):
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def match_sql(self):
+        return f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s'
+
+    def rank_sql(self):
+        # MATCH с rowid = ... заново разворачивает запрос для каждой строки ленты —
+        # квадратично по числу совпадений. Ранги всех совпадений считаются одним
+        # проходом: MATERIALIZED-подзапрос не зависит от строки и выполняется один раз
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return (
+            f'WITH ranks AS MATERIALIZED ('
+            f'SELECT rowid AS id, -bm25({self.table}, {weights}) AS rank '
+            f'FROM {self.table} WHERE {self.table} MATCH %s) '
+            f'SELECT rank FROM ranks WHERE id = {self.listing_table}.id'
+        )
+
+
+class PostgresBackend(SearchBackend):
+    # Морфологию делает tokenize(), поэтому конфигурация 'simple' без своего стемминга
+    def index(self, listing):
+        doc = document(listing)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.table} (listing_id, document) VALUES (
+                    %s,
+                    setweight(to_tsvector('simple', %s), 'A')
+                    || setweight(to_tsvector('simple', %s), 'B')
+                    || setweight(to_tsvector('simple', %s), 'C')
+                )
+                ON CONFLICT (listing_id) DO UPDATE SET document = EXCLUDED.document
+                """,
+                [listing.pk, doc['title'], doc['address'], doc['description']],
+            )
+
+    def remove(self, listing_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE listing_id = ANY(%s)', [list(listing_ids)])
+
+    def build_query(self, tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def match_sql(self):
+        return f"SELECT listing_id FROM {self.table} WHERE document @@ to_tsquery('simple', %s)"
+
+    def rank_sql(self):
+        # Поиск по первичному ключу listing_id: на строку один документ, без повторного @@
+        return (
+            f"SELECT ts_rank_cd(document, to_tsquery('simple', %s)) FROM {self.table} "
+            f"WHERE listing_id = {self.listing_table}.id"
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend():
+    from .models import Listing
+
+    try:
+        backend_class = BACKENDS[connection.vendor]
+    except KeyError:
+        raise ImproperlyConfigured(f'Полнотекстовый поиск не поддерживается для {connection.vendor}')
+    return backend_class(Listing._meta.db_table)
+
+
+# ───── Синхронизация индекса ─────
+def sync_listing(listing):
+    backend = get_backend()
+    if listing.is_active:
+        backend.index(listing)
+    else:
+        backend.remove([listing.pk])
+
+
+def reindex(queryset):
+    for listing in queryset.only('id', 'title', 'description', 'address', 'is_active').iterator():
+        sync_listing(listing)
+
+
+def search(queryset, text):
+    return get_backend().search(queryset, text)
+
+
+def matching(queryset, text):
+    return get_backend().matching(queryset, text)
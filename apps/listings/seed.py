@@ -0,0 +1,212 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from apps.users.models import User
+from .images import render_image, variant_name
+from .models import Application, Listing, ListingImage, ListingLike, Location
+
+
+# ───── Синтетические данные для бенчмарков ─────
+CITIES = {
+    'Бишкек': ['Октябрьский', 'Первомайский', 'Ленинский', 'Свердловский'],
+    'Ош': ['Центр', 'Черемушки', 'Амир-Тимур'],
+    'Каракол': ['Центр', 'Мичурина'],
+    'Джалал-Абад': ['Центр', 'Спутник'],
+    'Токмок': ['Центр'],
+}
+# Центры городов (широта, долгота); объявления разбрасываются вокруг них
+CITY_CENTERS = {
+    'Бишкек': (42.8746, 74.5698),
+    'Ош': (40.5140, 72.8161),
+    'Каракол': (42.4907, 78.3936),
+    'Джалал-Абад': (40.9333, 73.0000),
+    'Токмок': (42.8421, 75.3015),
+}
+STREETS = ['Киевская', 'Московская', 'Токтогула', 'Чуй', 'Манаса', 'Ахунбаева', 'Боконбаева', 'Абдрахманова']
+TITLES = ['Квартира', 'Студия', 'Дом', 'Пентхаус', 'Батир', 'Комната']
+ADJECTIVES = ['уютная', 'светлая', 'просторная', 'с ремонтом', 'в новостройке', 'у парка']
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Отключает auto_now_add у created_at, чтобы сид мог раскидать даты в прошлое."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if field.name == 'created_at' and field.auto_now_add
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def ensure_locations():
+    for city, districts in CITIES.items():
+        for district in districts:
+            Location.objects.get_or_create(city=city, district=district)
+    return list(Location.objects.all())
+
+
+def make_listing(rng, owner, locations, created_at):
+    rooms = rng.randint(1, 5)
+    deal_type = rng.choice(['sale', 'sale', 'rent'])
+    area = Decimal(rng.randint(18 + rooms * 12, 40 + rooms * 25))
+    price = Decimal(rng.randint(300, 1500) * 10) if deal_type == 'rent' else area * rng.randint(700, 2200)
+    street = rng.choice(STREETS)
+    location = rng.choice(locations)
+    lat, lng = CITY_CENTERS.get(location.city, (42.8746, 74.5698))
+    listing = Listing(
+        owner=owner,
+        title=f'{rng.choice(TITLES)} {rooms}-комн., {rng.choice(ADJECTIVES)}',
+        description=f'{rooms}-комнатная, {area} м², ул. {street}. ' * rng.randint(1, 6),
+        price=price,
+        rooms=rooms,
+        area=area,
+        location=location,
+        address=f'ул. {street}, {rng.randint(1, 200)}',
+        latitude=round(lat + rng.gauss(0, 0.03), 6),
+        longitude=round(lng + rng.gauss(0, 0.04), 6),
+        deal_type=deal_type,
+        is_active=rng.random() > 0.1,
+        created_at=created_at,
+    )
+    # bulk_create не вызывает save()
+    listing.update_geohash()
+    return listing
+
+
+def seed_users(realtors, admins=1, prefix='seed'):
+    """Пароль у всех сид-пользователей — seed-password (для получения JWT в бенчмарке)."""
+    users = []
+    for role, count in (('realtor', realtors), ('admin', admins)):
+        for i in range(count):
+            user, created = User.objects.get_or_create(
+                username=f'{prefix}-{role}-{i}',
+                defaults={'role': role, 'is_staff': role == 'admin', 'email': f'{prefix}-{role}-{i}@example.com'},
+            )
+            if created:
+                user.set_password('seed-password')
+                user.save(update_fields=['password'])
+            users.append(user)
+    return users
+
+
+def seed_listings(count, owners, batch_size=5000, seed=0, days=365):
+    """
+    Вставляет count объявлений через bulk_create. Сигналы (поисковый индекс, статистика)
+    не срабатывают — после сида запустите rebuild_search_index / rebuild_daily_stats.
+    """
+    rng = random.Random(seed)
+    locations = ensure_locations()
+    now = timezone.now()
+    step = timedelta(days=days) / max(count, 1)
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        batch = [
+            make_listing(rng, rng.choice(owners), locations, now - step * (created + i))
+            for i in range(size)
+        ]
+        with explicit_created_at(Listing), transaction.atomic():
+            Listing.objects.bulk_create(batch, batch_size=batch_size)
+        created += size
+    return created
+
+
+def sample_photos(count=8, size=(1600, 1200)):
+    """
+    Несколько настоящих WEBP с нарезанными размерами. Объявления ссылаются на них,
+    как если бы фоновая обработка уже прошла — без тысяч файлов на диске.
+    """
+    widths = settings.LISTING_IMAGE_VARIANT_WIDTHS
+    photos = []
+    for i in range(count):
+        img = Image.new('RGB', size, (40 + i * 25, 90, 160 - i * 10))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((size[0] // 4, size[1] // 3, size[0] * 3 // 4, size[1]), fill=(230, 220, 200))
+        raw = BytesIO()
+        img.save(raw, format='PNG')
+        data = raw.getvalue()
+
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        original, variants = render_image(data, widths, True)
+        name = f'listing_images/seed/{digest}.webp'
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(original))
+        sizes = {}
+        for width, content in variants.items():
+            sizes[str(width)] = variant_name(digest, width)
+            if not default_storage.exists(sizes[str(width)]):
+                default_storage.save(sizes[str(width)], ContentFile(content))
+        photos.append((name, {'source': name, 'sizes': sizes}))
+    return photos
+
+
+def random_past(rng, days):
+    return timezone.now() - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def bulk_insert(model, rows, batch_size=5000):
+    for start in range(0, len(rows), batch_size):
+        with explicit_created_at(model), transaction.atomic():
+            model.objects.bulk_create(rows[start:start + batch_size], batch_size=batch_size, ignore_conflicts=True)
+
+
+def seed_images(listing_ids, per_listing, seed=0):
+    rng = random.Random(seed)
+    photos = sample_photos()
+    rows = [
+        ListingImage(listing_id=listing_id, image=name, variants=variants, status=ListingImage.STATUS_READY)
+        for listing_id in listing_ids
+        for name, variants in rng.sample(photos, k=min(per_listing, len(photos)))
+    ]
+    bulk_insert(ListingImage, rows)
+    return len(rows)
+
+
+def seed_likes(listing_ids, count, seed=0, days=90):
+    rng = random.Random(seed)
+    # Популярность по Ципфу: немногие объявления собирают большую часть лайков
+    weights = [1 / (rank + 1) for rank in range(len(listing_ids))]
+    listings = rng.choices(listing_ids, weights=weights, k=count)
+    rows = [
+        ListingLike(
+            listing_id=listing_id,
+            ip_address=f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+            created_at=random_past(rng, days),
+        )
+        for i, listing_id in enumerate(listings)
+    ]
+    bulk_insert(ListingLike, rows)
+    Listing.objects.filter(pk__in=set(listings)).sync_likes_count()
+    return len(rows)
+
+
+def seed_applications(listing_ids, users, count, seed=0, days=90):
+    rng = random.Random(seed)
+    rows = [
+        Application(
+            listing_id=rng.choice(listing_ids),
+            user=rng.choice(users) if rng.random() < 0.3 else None,
+            message='Здравствуйте! Объявление ещё актуально?',
+            contact_phone=f'+996{rng.randint(500000000, 799999999)}',
+            created_at=random_past(rng, days),
+        )
+        for _ in range(count)
+    ]
+    bulk_insert(Application, rows)
+    return len(rows)
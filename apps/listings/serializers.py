@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from core.instrumentation import TimedSerializerMixin
 from .models import (
     Location,
     Listing,
@@ -9,49 +11,129 @@ from .models import (
 
 
 # ───── Локация ─────
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Location
         fields = ['id', 'city', 'district']
 
 
 # ───── Фото ─────
-class ListingImageSerializer(serializers.ModelSerializer):
+class ListingImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ListingImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'status', 'srcset']
+
+    def build_url(self, name):
+        url = ListingImage._meta.get_field('image').storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_srcset(self, obj):
+        return {f'{width}w': self.build_url(name) for width, name in obj.variant_names}
+
+
+class ListingImageThumbnailSerializer(ListingImageSerializer):
+    """Для карточек в ленте: только миниатюры, без полноразмерного файла."""
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta(ListingImageSerializer.Meta):
+        fields = ['id', 'status', 'thumbnail', 'srcset']
+
+    def get_thumbnail(self, obj):
+        variants = obj.variant_names
+        if variants:
+            return self.build_url(variants[0][1])
+        return self.build_url(obj.image.name) if obj.image else None
 
 
 # ───── Объявление ─────
-class ListingSerializer(serializers.ModelSerializer):
+class SparseFieldsSerializerMixin:
+    """Оставляет только поля из context['fields'] (см. fieldsets.py); None — все."""
+
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        fields = self.context.get('fields')
+        return names if fields is None else [name for name in names if name in fields]
+
+
+class ListingSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     location = LocationSerializer(read_only=True)
     images = ListingImageSerializer(many=True, read_only=True)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Listing
         fields = [
             'id', 'title', 'description', 'price', 'rooms', 'area',
-            'location', 'address', 'deal_type', 'is_active', 'created_at',
-            'images', 'likes_count'
+            'location', 'address', 'latitude', 'longitude', 'deal_type', 'is_active', 'created_at',
+            'updated_at', 'images', 'likes_count'
         ]
 
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Координаты задаются парой: latitude и longitude')
+        return attrs
+
+
+class ListingListSerializer(ListingSerializer):
+    images = ListingImageThumbnailSerializer(many=True, read_only=True)
+
+
+class TrendingListingSerializer(ListingListSerializer):
+    """
+    Карточка с popularity — только для /listings/trending/: счёт меняется без change_seq
+    (заявки, затухание), и в ETag деталки и ленты его нет.
+    """
+    popularity = serializers.FloatField(read_only=True)
+
+    class Meta(ListingListSerializer.Meta):
+        fields = ListingListSerializer.Meta.fields + ['popularity']
+
+
+class ListingImportRowSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Одна строка фида партнёра (CSV или XML) — см. importer.py."""
+    external_id = serializers.CharField(max_length=100)
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    rooms = serializers.IntegerField(min_value=0, max_value=32767)
+    area = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0)
+    city = serializers.CharField(max_length=100)
+    district = serializers.CharField(max_length=100)
+    address = serializers.CharField(max_length=255)
+    deal_type = serializers.ChoiceField(choices=Listing.DEAL_TYPE_CHOICES)
+    latitude = serializers.FloatField(min_value=-90, max_value=90, required=False, allow_null=True)
+    longitude = serializers.FloatField(min_value=-180, max_value=180, required=False, allow_null=True)
+    is_active = serializers.BooleanField(default=True)
+    images = serializers.ListField(child=serializers.URLField(), required=False, default=list)
+
+    def validate(self, attrs):
+        if (attrs.get('latitude') is None) != (attrs.get('longitude') is None):
+            raise serializers.ValidationError('Координаты задаются парой: latitude и longitude')
+        return attrs
+
 
 # ───── Заявка ─────
-class ApplicationSerializer(serializers.ModelSerializer):
+class ApplicationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Application
         fields = ['id', 'listing', 'message', 'contact_phone', 'created_at']
         read_only_fields = ['id', 'created_at']
 
     def create(self, validated_data):
-        request = self.context.get('request')
-        user = request.user if request and request.user.is_authenticated else None
-        return Application.objects.create(user=user, **validated_data)
+        # perform_create может передать user через save(user=...)
+        if 'user' not in validated_data:
+            request = self.context.get('request')
+            validated_data['user'] = request.user if request and request.user.is_authenticated else None
+        return Application.objects.create(**validated_data)
 
 
 # ───── Лайк (опциональный вывод) ─────
-class ListingLikeSerializer(serializers.ModelSerializer):
+class ListingLikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ListingLike
         fields = ['id', 'listing', 'ip_address', 'created_at']
@@ -0,0 +1,86 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, popularity, response_cache, search
+from .models import (
+    Application, ChangeCounter, DailyStats, Listing, ListingImage, ListingLike, ListingTombstone, Location,
+)
+
+
+# ───── Поисковый индекс ─────
+@receiver(post_save, sender=Listing)
+def sync_search_index(sender, instance, **kwargs):
+    search.sync_listing(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def drop_from_search_index(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+
+# ───── Дневная статистика ─────
+@receiver(post_save, sender=Listing)
+def count_listing_events(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        DailyStats.bump(listings_created=1)
+    elif getattr(instance, '_loaded_is_active', None) and not instance.is_active:
+        DailyStats.bump(listings_deactivated=1)
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_save, sender=Application)
+def count_application(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        DailyStats.bump(applications=1)
+
+
+@receiver(post_save, sender=ListingLike)
+def count_like(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        DailyStats.bump(likes=1)
+
+
+# ───── Популярность ─────
+@receiver(post_save, sender=Application)
+def score_application(sender, instance, created, raw=False, **kwargs):
+    # Лайки учитываются в ListingLikeToggleView, тем же UPDATE, что и likes_count
+    if created and not raw:
+        popularity.bump(instance.listing_id, 'application')
+
+
+# ───── Кэш ответов ─────
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=ListingImage)
+def invalidate_listing_responses(sender, **kwargs):
+    response_cache.invalidate('listings')
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_responses(sender, **kwargs):
+    response_cache.invalidate('locations')
+
+
+# ───── Синхронизация ─────
+@receiver([post_save, post_delete], sender=ListingImage)
+def touch_listing_on_image_change(sender, instance, raw=False, **kwargs):
+    # Фото приходят в /listings/sync/ вместе с объявлением
+    if not raw:
+        Listing.objects.filter(pk=instance.listing_id).touch()
+
+
+@receiver(post_delete, sender=Listing)
+def leave_tombstone(sender, instance, **kwargs):
+    ListingTombstone.objects.update_or_create(
+        listing_id=instance.pk,
+        defaults={'change_seq': ChangeCounter.next(Listing.SYNC_COUNTER)},
+    )
+
+
+# ───── Автодополнение ─────
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=Location)
+def refresh_autocomplete(sender, **kwargs):
+    # Индекс догонит изменения при следующем запросе (autocomplete.py)
+    autocomplete.index.mark_stale()
@@ -0,0 +1,200 @@
+import heapq
+import math
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+
+from . import sync
+from .models import JobState, Listing, ListingTombstone, SimilarListings
+
+
+# ───── Похожие объявления ─────
+# Соседи ищутся внутри группы «тип сделки + район». Признаки нормированы так, что
+# единица расстояния — это 25% по цене, одна комната или 20% по площади (цена и
+# площадь в логарифмах: разница в процентах, а не в сомах). Группа сортируется по
+# цене, и от каждого объявления просмотр идёт в обе стороны, пока одна только
+# разница цены не превысит расстояние до K-го лучшего, — точные K ближайших без
+# перебора всех пар. Результат хранится в SimilarListings: ответ — чтение по pk.
+# Команда build_similar_listings пересчитывает соседей только у тех, кого задели
+# изменения после прошлого запуска (по change_seq, как /listings/sync/).
+
+PRICE_SCALE = math.log(1.25)
+ROOMS_SCALE = 1.0
+AREA_SCALE = math.log(1.2)
+
+# change_seq, до которого соседи уже пересчитаны (строка JobState)
+CLOCK = 'similar_listings_seq'
+# Больше изменений — дешевле пересчитать всё
+MAX_INCREMENTAL = 5000
+
+FEATURES = ('id', 'deal_type', 'location_id', 'price', 'rooms', 'area')
+
+
+def bucket_key(deal_type, location_id):
+    return f'{deal_type}:{location_id or "-"}'
+
+
+def parse_bucket(key):
+    deal_type, location_id = key.split(':')
+    return deal_type, None if location_id == '-' else int(location_id)
+
+
+def vector(price, rooms, area):
+    return (
+        math.log(max(float(price), 1)) / PRICE_SCALE,
+        rooms / ROOMS_SCALE,
+        math.log(max(float(area), 1)) / AREA_SCALE,
+    )
+
+
+class Group:
+    """Объявления одной группы, отсортированные по цене, — для поиска соседей."""
+
+    def __init__(self, rows):
+        points = sorted((*vector(price, rooms, area), pk) for pk, price, rooms, area in rows)
+        self.prices = [point[0] for point in points]
+        self.rooms = [point[1] for point in points]
+        self.areas = [point[2] for point in points]
+        self.ids = [point[3] for point in points]
+        self.positions = {pk: position for position, pk in enumerate(self.ids)}
+
+    def distance(self, pk, other):
+        first, second = self.positions[pk], self.positions[other]
+        return (
+            (self.prices[first] - self.prices[second]) ** 2
+            + (self.rooms[first] - self.rooms[second]) ** 2
+            + (self.areas[first] - self.areas[second]) ** 2
+        )
+
+    def nearest(self, pk, count):
+        prices, rooms, areas, ids = self.prices, self.rooms, self.areas, self.ids
+        position = self.positions[pk]
+        price, room, area = prices[position], rooms[position], areas[position]
+        # Куча с обратным знаком: на вершине — худший из найденных
+        best = []
+        worst = math.inf
+        for other, stop, step in ((position - 1, -1, -1), (position + 1, len(ids), 1)):
+            while other != stop:
+                distance = (prices[other] - price) ** 2
+                if distance >= worst:
+                    break
+                distance += (rooms[other] - room) ** 2 + (areas[other] - area) ** 2
+                if len(best) < count:
+                    heapq.heappush(best, (-distance, -ids[other]))
+                    if len(best) == count:
+                        worst = -best[0][0]
+                elif distance < worst:
+                    heapq.heapreplace(best, (-distance, -ids[other]))
+                    worst = -best[0][0]
+                other += step
+        return [-other_pk for _, other_pk in sorted(best, reverse=True)]
+
+
+def nearest(rows, count):
+    """rows — [(pk, price, rooms, area)] одной группы. Возвращает {pk: [id соседей]}."""
+    group = Group(rows)
+    return {pk: group.nearest(pk, count) for pk in group.ids}
+
+
+def set_clock(value):
+    JobState.write(CLOCK, value)
+
+
+def group_rows(key):
+    deal_type, location_id = parse_bucket(key)
+    return Listing.objects.active().filter(deal_type=deal_type, location_id=location_id).values_list(
+        'id', 'price', 'rooms', 'area'
+    )
+
+
+def rebuild():
+    """Все группы заново. Возвращает (групп, объявлений)."""
+    count = settings.SIMILAR_LISTINGS_COUNT
+    current = sync.current_seq()
+    rows = (
+        Listing.objects.active().order_by('deal_type', 'location_id')
+        .values_list(*FEATURES).iterator(chunk_size=5000)
+    )
+    created = []
+    keys = set()
+    for (deal_type, location_id), group in groupby(rows, key=lambda row: (row[1], row[2])):
+        key = bucket_key(deal_type, location_id)
+        keys.add(key)
+        for pk, ids in nearest([(pk, price, rooms, area) for pk, _, _, price, rooms, area in group], count).items():
+            created.append(SimilarListings(listing_id=pk, bucket=key, neighbor_ids=ids))
+
+    with transaction.atomic():
+        SimilarListings.objects.all().delete()
+        SimilarListings.objects.bulk_create(created, batch_size=1000)
+        set_clock(current)
+    return len(keys), len(created)
+
+
+def affected(group, stored, changed, count):
+    """
+    Кому в группе пересчитывать соседей: новым и изменённым объявлениям; тем, у кого
+    в списке есть изменённое или ушедшее; тем, кому изменённое теперь ближе K-го соседа.
+    """
+    arrivals = [pk for pk in changed if pk in group.positions]
+    result = {pk for pk in group.ids if pk not in stored}
+    for pk, ids in stored.items():
+        if pk not in group.positions or pk in result:
+            continue
+        gone = any(other not in group.positions for other in ids)
+        if gone or changed.intersection(ids) or len(ids) < count and arrivals:
+            result.add(pk)
+            continue
+        worst = group.distance(pk, ids[-1]) if ids else math.inf
+        if any(group.distance(pk, other) < worst for other in arrivals):
+            result.add(pk)
+    return result
+
+
+def refresh():
+    """
+    Пересчитывает соседей только у объявлений, которых коснулись изменения после
+    прошлого запуска. Возвращает (групп, объявлений).
+    """
+    last = JobState.read(CLOCK)
+    if last is None:
+        return rebuild()
+    current = sync.current_seq()
+    changed = list(Listing.objects.filter(change_seq__gt=last).values_list('id', 'deal_type', 'location_id'))
+    if len(changed) > MAX_INCREMENTAL:
+        return rebuild()
+
+    changed_ids = {pk for pk, _, _ in changed}
+    changed_ids.update(ListingTombstone.objects.filter(change_seq__gt=last).values_list('listing_id', flat=True))
+    keys = {bucket_key(deal_type, location_id) for _, deal_type, location_id in changed}
+    # Группа, из которой объявление ушло (сменился район или тип сделки)
+    keys.update(SimilarListings.objects.filter(listing_id__in=changed_ids).values_list('bucket', flat=True))
+
+    count = settings.SIMILAR_LISTINGS_COUNT
+    total = 0
+    with transaction.atomic():
+        # Строки изменённых объявлений создаются заново в их нынешней группе
+        SimilarListings.objects.filter(listing_id__in=changed_ids).delete()
+        for key in keys:
+            group = Group(group_rows(key))
+            stored = dict(SimilarListings.objects.filter(bucket=key).values_list('listing_id', 'neighbor_ids'))
+            update = affected(group, stored, changed_ids, count)
+            if len(update) > len(group.ids) // 2:
+                # Задета большая часть группы — проще заменить её целиком
+                update = group.ids
+                SimilarListings.objects.filter(bucket=key).delete()
+            else:
+                gone = [pk for pk in stored if pk not in group.positions]
+                SimilarListings.objects.filter(listing_id__in=[*update, *gone]).delete()
+            SimilarListings.objects.bulk_create(
+                [SimilarListings(listing_id=pk, bucket=key, neighbor_ids=group.nearest(pk, count)) for pk in update],
+                batch_size=1000,
+            )
+            total += len(update)
+        set_clock(current)
+    return len(keys), total
+
+
+def neighbor_ids(pk):
+    """Посчитанные соседи; None — для объявления ещё не считали."""
+    return SimilarListings.objects.filter(listing_id=pk).values_list('neighbor_ids', flat=True).first()
@@ -0,0 +1,97 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .models import ChangeCounter, Listing, ListingTombstone
+
+
+# ───── Дельта-синхронизация для мобильного клиента ─────
+# Каждая запись объявления получает change_seq из ChangeCounter. Клиент хранит курсор
+# (change_seq, id) последней полученной строки и при запуске забирает только то,
+# что изменилось после него. Снятые с публикации и удалённые объявления приходят
+# в deleted — клиент убирает их у себя.
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def encode_cursor(change_seq, pk, baseline=None):
+    payload = {'s': change_seq, 'i': pk}
+    if baseline is not None:
+        payload['b'] = baseline
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(value):
+    """(change_seq, id, baseline): baseline есть только у страниц первичной загрузки."""
+    if not value:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode()))
+        baseline = payload.get('b')
+        return int(payload['s']), int(payload['i']), None if baseline is None else int(baseline)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValidationError({'cursor': 'Неверный курсор'})
+
+
+def parse_limit(value):
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def after(cursor, pk_field):
+    change_seq, pk = cursor[:2]
+    return Q(change_seq__gt=change_seq) | Q(change_seq=change_seq, **{f'{pk_field}__gt': pk})
+
+
+def current_seq():
+    return ChangeCounter.objects.filter(name=Listing.SYNC_COUNTER).values_list('value', flat=True).first() or 0
+
+
+def collect_changes(queryset, cursor, limit):
+    """
+    Изменения после курсора по возрастанию (change_seq, id): до limit штук из объявлений
+    и «надгробий» удалённых строк. Возвращает (объявления, id удалённых, курсор, has_more).
+    """
+    # Счётчик читается до выборки: всё с номером <= current уже закоммичено
+    current = current_seq()
+    if cursor is not None and cursor[2] is None and cursor[0] > current:
+        # Ничего не менялось — самый частый ответ, один запрос
+        return [], [], encode_cursor(*cursor[:2]), False
+
+    # Первичная загрузка (без курсора или с baseline): только активные, без удалений,
+    # и не дальше baseline — номера на момент первой страницы. Всё, что изменится
+    # после (включая снятие уже отданного объявления), придёт следующей дельтой
+    baseline = current if cursor is None else cursor[2]
+    initial = baseline is not None
+    listings = queryset.order_by('change_seq', 'id')
+    tombstones = ListingTombstone.objects.order_by('change_seq', 'listing_id')
+    if cursor is not None:
+        listings = listings.filter(after(cursor, 'id'))
+        tombstones = tombstones.filter(after(cursor, 'listing_id'))
+    if initial:
+        listings = listings.filter(is_active=True, change_seq__lte=baseline)
+        tombstones = tombstones.none()
+
+    merged = sorted(
+        [(listing.change_seq, listing.pk, listing) for listing in listings[:limit + 1]]
+        + [(change_seq, pk, None) for change_seq, pk in tombstones.values_list('change_seq', 'listing_id')[:limit + 1]],
+        key=lambda item: item[:2],
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    changed = [listing for _, _, listing in merged if listing is not None and listing.is_active]
+    deleted = [pk for _, pk, listing in merged if listing is None or not listing.is_active]
+    if has_more:
+        next_cursor = encode_cursor(*merged[-1][:2], baseline)
+    else:
+        # Дальше — только то, что закоммитят после current (или baseline)
+        end = (baseline if initial else current) + 1, 0
+        last = merged[-1][:2] if merged else (0, 0)
+        next_cursor = encode_cursor(*max(end, last))
+    return changed, deleted, next_cursor, has_more
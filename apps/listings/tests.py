@@ -1,3 +1,1243 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import shutil
+import socket
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from core.instrumentation import RequestTimingMiddleware
+from core.renderers import ORJSONRenderer
+from core.replicas import ReplicaMiddleware, ReplicaRouter, primary
+from core.sqlite import retry_on_lock
+from . import autocomplete, importer, popularity, response_cache, similar, sync, views
+from .images import ImagePipeline, process_image, render_image
+from .models import Application, DailyStats, JobState, Listing, ListingImage, ListingLike, Location
+
+
+def make_listing(owner, location, **kwargs):
+    data = {
+        'owner': owner,
+        'title': 'Квартира',
+        'description': 'Описание',
+        'price': 50000,
+        'rooms': 2,
+        'area': 60,
+        'location': location,
+        'address': 'ул. Киевская, 1',
+        'deal_type': 'sale',
+    }
+    data.update(kwargs)
+    return Listing.objects.create(**data)
+
+
+class ListingQueryCountTests(TestCase):
+    """Число запросов на эндпоинт не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.location = Location.objects.create(city='Бишкек', district='Октябрьский')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def seed(self, count):
+        for i in range(count):
+            listing = make_listing(self.realtor, self.location, title=f'Квартира {i}')
+            # Уже обработанное фото с размерами: variants['source'] совпадает с image,
+            # поэтому save() не ставит его в очередь конвертации
+            name = f'listing_images/{i}.webp'
+            ListingImage.objects.create(
+                listing=listing, image=name, status=ListingImage.STATUS_READY,
+                variants={'source': name, 'sizes': {'320': f'listing_images/variants/{i}_320w.webp'}},
+            )
+            ListingLike.objects.create(listing=listing, ip_address=f'10.0.0.{i % 250 + 1}')
+        Listing.objects.sync_likes_count()
+
+    def test_list_query_count(self):
+        for size in (1, 10):
+            Listing.objects.all().delete()
+            self.seed(size)
+            # listings + images
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/v1/listings/listings/')
+            self.assertEqual(response.status_code, 200)
+
+    def test_detail_query_count(self):
+        self.seed(3)
+        listing = Listing.objects.first()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/listings/listings/{listing.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_my_listings_query_count(self):
+        self.client.force_authenticate(self.realtor)
+        for size in (1, 10):
+            Listing.objects.all().delete()
+            self.seed(size)
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/v1/listings/listings/my/')
+            self.assertEqual(response.status_code, 200)
+
+
+class ListingLikeCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.listing = make_listing(realtor, Location.objects.create(city='Бишкек', district='Центр'))
+
+    def like(self, pk, ip='10.0.0.1'):
+        return self.client.post(f'/api/v1/listings/listings/{pk}/like/', REMOTE_ADDR=ip)
+
+    def test_toggle_updates_counter(self):
+        self.assertEqual(self.like(self.listing.pk).data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.like(self.listing.pk, ip='10.0.0.2').data, {'liked': True, 'likes_count': 2})
+        self.assertEqual(self.like(self.listing.pk).data, {'liked': False, 'likes_count': 1})
+        self.assertEqual(ListingLike.objects.filter(listing=self.listing).count(), 1)
+
+    def test_toggle_query_count(self):
+        # SAVEPOINT/RELEASE + DELETE + INSERT + UPDATE + SELECT счётчика + дневная статистика
+        with self.assertNumQueries(7):
+            self.like(self.listing.pk)
+
+    def test_missing_listing(self):
+        self.assertEqual(self.like(self.listing.pk + 100).status_code, 404)
+        self.assertFalse(ListingLike.objects.exists())
+
+    def test_integrity_error_from_concurrent_like(self):
+        ListingLike.objects.create(listing=self.listing, ip_address='10.0.0.1')
+        with mock.patch.object(views.ListingLikeToggleView, 'toggle', side_effect=IntegrityError):
+            self.assertEqual(self.like(self.listing.pk).data['liked'], True)
+
+    def test_integrity_error_for_deleted_listing(self):
+        pk = self.listing.pk
+        Listing.objects.filter(pk=pk).delete()
+        with mock.patch.object(views.ListingLikeToggleView, 'toggle', side_effect=IntegrityError):
+            self.assertEqual(self.like(pk).status_code, 404)
+
+    def test_unrelated_integrity_error_is_not_reported_as_like(self):
+        with mock.patch.object(views.ListingLikeToggleView, 'toggle', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.like(self.listing.pk)
+
+    def test_reconciliation_repairs_drift(self):
+        ListingLike.objects.create(listing=self.listing, ip_address='10.0.0.9')
+        Listing.objects.filter(pk=self.listing.pk).update(likes_count=7)
+        self.assertEqual(Listing.objects.sync_likes_count(), 1)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.likes_count, 1)
+        self.assertEqual(Listing.objects.sync_likes_count(), 0)
+
+
+class AdminStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin', is_staff=True)
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.location = Location.objects.create(city='Бишкек', district='Центр')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_rollup_is_maintained_incrementally(self):
+        listing = make_listing(self.realtor, self.location)
+        make_listing(self.realtor, self.location)
+        Application.objects.create(listing=listing, contact_phone='+996555000000')
+        self.client.post(f'/api/v1/listings/listings/{listing.pk}/like/')
+        self.client.delete(f'/api/v1/listings/listings/{listing.pk}/')
+
+        today = DailyStats.objects.get()
+        self.assertEqual(
+            (today.listings_created, today.listings_deactivated, today.applications, today.likes),
+            (2, 1, 1, 1),
+        )
+
+    def test_stats_are_aggregated_and_cached(self):
+        listing = make_listing(self.realtor, self.location, is_active=False)
+        Application.objects.create(listing=listing, contact_phone='+996555000000')
+        # users + listings + заявки за неделю + тренд
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/v1/listings/admin/stats/')
+        self.assertEqual(response.data['users'], {'total': 2, 'realtors': 1, 'admins': 1})
+        self.assertEqual(response.data['listings'], {'total': 1, 'active': 0, 'inactive': 1})
+        self.assertEqual(response.data['applications_last_7_days'], 1)
+        self.assertEqual(response.data['trend'][0]['listings_created'], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/listings/admin/stats/')
+        self.assertEqual(self.client.get('/api/v1/listings/admin/stats/?days=7').status_code, 400)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        cls.location = Location.objects.create(city='Бишкек', district='Центр')
+        cls.listing = make_listing(cls.realtor, cls.location, price=50000)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_equivalent_queries_share_entry(self):
+        first = self.client.get('/api/v1/listings/listings/?deal_type=sale&price__gte=50000')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/v1/listings/listings/?price__gte=50000.00&deal_type=sale')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.metrics()['listings'], {'hits': 1, 'misses': 1})
+
+    def test_page_size_is_not_normalized_as_number(self):
+        # 1e1 не число для пагинации: ответ с размером по умолчанию не должен уйти на ?page_size=10
+        self.client.get('/api/v1/listings/listings/?page_size=1e1')
+        self.assertEqual(self.client.get('/api/v1/listings/listings/?page_size=10')['X-Cache'], 'MISS')
+
+    def test_save_invalidates_only_dependent_namespace(self):
+        self.client.get('/api/v1/listings/listings/')
+        self.client.get('/api/v1/listings/locations/list/')
+        self.listing.title = 'Новый заголовок'
+        self.listing.save()
+
+        response = self.client.get('/api/v1/listings/listings/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Новый заголовок')
+        self.assertEqual(self.client.get('/api/v1/listings/locations/list/')['X-Cache'], 'HIT')
+
+        Location.objects.create(city='Ош', district='Центр')
+        self.assertEqual(self.client.get('/api/v1/listings/listings/')['X-Cache'], 'MISS')
+
+    def test_admins_bypass_cache(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/v1/listings/listings/')
+        self.assertNotIn('X-Cache', response)
+
+
+class ListingFacetsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        center = Location.objects.create(city='Бишкек', district='Центр')
+        osh = Location.objects.create(city='Ош', district='Центр')
+        make_listing(realtor, center, rooms=1, price=8000, deal_type='rent')
+        make_listing(realtor, center, rooms=2, price=60000)
+        make_listing(realtor, osh, rooms=2, price=250000, title='Дом у реки')
+        make_listing(realtor, osh, rooms=3, price=90000, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_counts_ignore_own_filter(self):
+        # Один GROUP BY на фасет
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/v1/listings/listings/facets/?location__city=Бишкек&rooms=2')
+        data = response.data
+        self.assertEqual(data['city'], [{'value': 'Бишкек', 'count': 1}, {'value': 'Ош', 'count': 1}])
+        self.assertEqual(data['rooms'], [{'value': 1, 'count': 1}, {'value': 2, 'count': 1}])
+        self.assertEqual(data['district'], [{'city': 'Бишкек', 'value': 'Центр', 'count': 1}])
+        self.assertEqual(data['deal_type'], [{'value': 'sale', 'count': 1}])
+        self.assertEqual(data['price'], [{'min': 50000, 'max': 100000, 'count': 1}])
+
+    def test_search_and_invalid_params(self):
+        data = self.client.get('/api/v1/listings/listings/facets/?search=реки').data
+        self.assertEqual(data['price'], [{'min': 200000, 'max': None, 'count': 1}])
+        response = self.client.get('/api/v1/listings/listings/facets/?rooms=много')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unfiltered_facets_are_cached(self):
+        self.assertEqual(self.client.get('/api/v1/listings/listings/facets/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/listings/listings/facets/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(sum(row['count'] for row in response.data['price']), 3)
+        self.assertNotIn('X-Cache', self.client.get('/api/v1/listings/listings/facets/?rooms=2'))
+
+
+class ListingGeoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        location = Location.objects.create(city='Бишкек', district='Центр')
+        # Два объявления в центре Бишкека (~1 км друг от друга), одно в Оше, одно без координат
+        cls.center = make_listing(cls.realtor, location, latitude=42.8746, longitude=74.5698)
+        cls.near = make_listing(cls.realtor, location, latitude=42.8800, longitude=74.5800, rooms=3)
+        cls.osh = make_listing(cls.realtor, location, latitude=40.5140, longitude=72.8161)
+        make_listing(cls.realtor, location)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def ids(self, query):
+        response = self.client.get(f'/api/v1/listings/listings/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data['results']}
+
+    def test_geohash_follows_coordinates(self):
+        self.assertTrue(self.center.geohash.startswith('txt5'))
+        self.center.latitude, self.center.longitude = 40.5140, 72.8161
+        self.center.save(update_fields=['latitude', 'longitude'])
+        self.center.refresh_from_db()
+        self.assertEqual(self.center.geohash, self.osh.geohash)
+
+    def test_bbox_and_radius(self):
+        self.assertEqual(self.ids('bbox=74.5,42.8,74.7,42.9'), {self.center.pk, self.near.pk})
+        self.assertEqual(self.ids('bbox=74.5,42.8,74.7,42.9&rooms=3'), {self.near.pk})
+        self.assertEqual(self.ids('lat=42.8746&lng=74.5698&radius=0.5'), {self.center.pk})
+        self.assertEqual(self.ids('lat=42.8746&lng=74.5698&radius=2'), {self.center.pk, self.near.pk})
+        self.assertEqual(self.client.get('/api/v1/listings/listings/?bbox=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/listings/listings/?radius=5').status_code, 400)
+
+    def test_clusters_per_zoom(self):
+        world = self.client.get('/api/v1/listings/listings/clusters/?tile=0/0/0').data
+        self.assertEqual(sum(row['count'] for row in world['clusters']), 3)
+        city = self.client.get('/api/v1/listings/listings/clusters/?bbox=74.5,42.8,74.7,42.9&zoom=5').data
+        self.assertEqual(city['clusters'][0]['count'], 2)
+        self.assertIsNone(city['clusters'][0]['listing_id'])
+        street = self.client.get('/api/v1/listings/listings/clusters/?bbox=74.5,42.8,74.7,42.9&zoom=16').data
+        self.assertEqual({row['listing_id'] for row in street['clusters']}, {self.center.pk, self.near.pk})
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/listings/listings/clusters/?tile=0/0/0')
+        self.assertEqual(self.client.get('/api/v1/listings/listings/clusters/?bbox=74.5,42.8,74.7,42.9').status_code, 400)
+
+
+class ListingSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        location = Location.objects.create(city='Бишкек', district='Центр')
+        cls.listings = [make_listing(cls.realtor, location, title=f'Квартира {i}') for i in range(4)]
+        cls.listings[3].is_active = False
+        cls.listings[3].save()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get('/api/v1/listings/listings/sync/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_initial_sync_pages_through_active_listings(self):
+        first = self.sync(limit=2)
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['cursor'], limit=2)
+        self.assertFalse(second['has_more'])
+        ids = [row['id'] for row in first['changes'] + second['changes']]
+        self.assertEqual(ids, [listing.pk for listing in self.listings[:3]])
+        self.assertEqual(second['deleted'], [])
+
+    def test_deactivation_during_initial_paging_comes_in_delta(self):
+        first = self.sync(limit=2)
+        deactivated = self.listings[0]
+        self.assertEqual(first['changes'][0]['id'], deactivated.pk)
+        deactivated.is_active = False
+        deactivated.save()
+        # Правка после снятия: её номер больше, курсор не должен перескочить снятие
+        edited = self.listings[2]
+        edited.price = 61000
+        edited.save()
+
+        page = self.sync(first['cursor'], limit=2)
+        self.assertEqual(page['changes'], [])
+        self.assertFalse(page['has_more'])
+        delta = self.sync(page['cursor'])
+        self.assertEqual(delta['deleted'], [deactivated.pk])
+        self.assertEqual([row['id'] for row in delta['changes']], [edited.pk])
+
+    def test_delta_contains_updates_and_tombstones(self):
+        cursor = self.sync()['cursor']
+        with self.assertNumQueries(1):
+            idle = self.sync(cursor)
+        self.assertEqual((idle['changes'], idle['deleted'], idle['cursor']), ([], [], cursor))
+
+        updated, soft_deleted, hard_deleted = self.listings[:3]
+        self.client.force_authenticate(self.realtor)
+        self.client.patch(f'/api/v1/listings/listings/{updated.pk}/', {'price': '61000'})
+        self.client.delete(f'/api/v1/listings/listings/{soft_deleted.pk}/')
+        hard_deleted_id = hard_deleted.pk
+        hard_deleted.delete()
+        # Лайки не двигают курсор: счётчик и так догоняется при следующей правке
+        self.client.post(f'/api/v1/listings/listings/{updated.pk}/like/')
+
+        # счётчик + объявления + фото + удалённые
+        with self.assertNumQueries(4):
+            delta = self.sync(cursor)
+        self.assertEqual([row['id'] for row in delta['changes']], [updated.pk])
+        self.assertEqual(delta['changes'][0]['price'], '61000.00')
+        self.assertEqual(delta['deleted'], [soft_deleted.pk, hard_deleted_id])
+        self.assertEqual(self.sync(delta['cursor'])['changes'], [])
+
+    def test_admin_bulk_actions_bump_sequence(self):
+        cursor = self.sync()['cursor']
+        Listing.objects.filter(pk=self.listings[3].pk).touch(is_active=True)
+        self.assertEqual([row['id'] for row in self.sync(cursor)['changes']], [self.listings[3].pk])
+        self.assertEqual(self.client.get('/api/v1/listings/listings/sync/?cursor=broken').status_code, 400)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.other = User.objects.create_user(username='other', password='x', role='realtor')
+        cls.admin = User.objects.create_superuser(username='admin', password='x', role='admin')
+        location = Location.objects.create(city='Бишкек', district='Центр')
+        cls.listings = [make_listing(cls.realtor, location, title=f'Квартира {i}') for i in range(3)]
+        make_listing(cls.other, location, title='=HYPERLINK("http://evil")')
+        Application.objects.create(listing=cls.listings[0], contact_phone='+996555000000', message='Актуально?')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_realtor_gets_own_rows_as_csv_and_ndjson(self):
+        self.client.force_authenticate(self.realtor)
+        response = self.client.get('/api/v1/listings/listings/export/')
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(StringIO(self.content(response).lstrip('\ufeff'))))
+        self.assertEqual(rows[0][:3], ['id', 'title', 'deal_type'])
+        self.assertEqual([row[1] for row in rows[1:]], ['Квартира 0', 'Квартира 1', 'Квартира 2'])
+
+        response = self.client.get('/api/v1/listings/applications/export/?as=ndjson')
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(lines, [{
+            'id': lines[0]['id'], 'listing_id': self.listings[0].pk, 'listing_title': 'Квартира 0',
+            'user': None, 'contact_phone': '+996555000000', 'message': 'Актуально?',
+            'created_at': lines[0]['created_at'],
+        }])
+        self.assertEqual(self.client.get('/api/v1/listings/listings/export/?as=xlsx').status_code, 400)
+
+    def test_admin_action_escapes_formulas(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/listings/listing/', {
+            'action': 'export_csv',
+            '_selected_action': list(Listing.objects.values_list('pk', flat=True)),
+        })
+        content = self.content(response)
+        self.assertIn('"\'=HYPERLINK(""http://evil"")"', content)
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.listing = make_listing(cls.realtor, Location.objects.create(city='Бишкек', district='Центр'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_detail_revalidates_without_serializing(self):
+        url = f'/api/v1/listings/listings/{self.listing.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Лайк не двигает change_seq, но меняет ETag
+        self.client.post(f'{url}like/')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.force_authenticate(self.realtor)
+        self.assertIn('private', self.client.get(url)['Cache-Control'])
+
+    def test_list_revalidates_from_response_cache(self):
+        url = '/api/v1/listings/locations/list/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Новое поколение с теми же данными — ETag тот же
+        response_cache.invalidate('locations')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Location.objects.create(city='Ош', district='Центр')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.listing = make_listing(cls.realtor, Location.objects.create(city='Бишкек', district='Центр'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_fields_narrow_response_and_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/listings/listings/?fields=title,price')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title', 'price'])
+        # Без фото и локации — один запрос, и описание не читается
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('description', queries[0]['sql'])
+
+    def test_omit_and_detail(self):
+        results = self.client.get('/api/v1/listings/listings/?omit=description,images').data['results']
+        self.assertNotIn('description', results[0])
+        self.assertEqual(results[0]['location']['city'], 'Бишкек')
+
+        url = f'/api/v1/listings/listings/{self.listing.pk}/'
+        response = self.client.get(f'{url}?fields=title,location')
+        self.assertEqual(set(response.data), {'id', 'title', 'location'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get('/api/v1/listings/listings/?fields=title,owner')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('owner', str(response.data['fields']))
+
+
+class ORJSONRendererTests(TestCase):
+    def test_matches_drf_json(self):
+        data = {
+            'price': Decimal('10.50'),
+            'when': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+            'detail': gettext_lazy('Not found.'),
+            1: [None, 'Бишкек'],
+        }
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+# SimpleTestCase: внутри транзакции TestCase роутер всегда читает с primary.
+# Тесты идут в одном процессе, так что LocMem здесь и есть общий кэш
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5, SHARED_CACHE=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, method, view_class, status=200, ip='10.0.0.1'):
+        seen = {}
+
+        def view(request):
+            seen['read'] = self.router.db_for_read(Listing)
+            seen['write'] = self.router.db_for_write(Listing)
+            with primary():
+                seen['primary'] = self.router.db_for_read(Listing)
+            with response_cache.fill_source(['listings', 'locations']):
+                seen['fill'] = self.router.db_for_read(Listing)
+            return HttpResponse(status=status)
+
+        view.cls = view_class
+        middleware = ReplicaMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        middleware(getattr(self.factory, method)('/', REMOTE_ADDR=ip))
+        return seen
+
+    def test_reads_go_to_replica_for_marked_views(self):
+        seen = self.route('get', views.ListingListCreateView)
+        self.assertEqual(seen, {'read': 'replica1', 'write': 'default', 'primary': None, 'fill': 'replica1'})
+        self.assertIsNone(self.router.db_for_read(Listing))
+        self.assertIsNone(self.route('get', views.ListingSyncView)['read'])
+        self.assertIsNone(self.route('post', views.ListingListCreateView)['read'])
+
+    def test_client_sticks_to_primary_after_write(self):
+        self.route('post', views.ListingLikeToggleView, status=400)
+        self.assertEqual(self.route('get', views.ListingRetrieveUpdateDestroyView)['read'], 'replica1')
+
+        self.route('post', views.ListingLikeToggleView)
+        self.assertIsNone(self.route('get', views.ListingRetrieveUpdateDestroyView)['read'])
+        self.assertEqual(self.route('get', views.ListingRetrieveUpdateDestroyView, ip='10.0.0.2')['read'], 'replica1')
+
+    def test_cache_fill_reads_primary_after_invalidation(self):
+        response_cache.invalidate('locations')
+        seen = self.route('get', views.LocationListView)
+        self.assertEqual((seen['read'], seen['fill']), ('replica1', None))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_replicas_require_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(DB_LOCK_RETRIES=2, DB_LOCK_RETRY_DELAY=0)
+class RetryOnLockTests(SimpleTestCase):
+    def failing(self, *errors):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return 'ok'
+
+        return func, calls
+
+    def test_retries_lock_errors_only(self):
+        func, calls = self.failing(OperationalError('database is locked'), OperationalError('database is locked'))
+        self.assertEqual(retry_on_lock(func), 'ok')
+        self.assertEqual(len(calls), 3)
+
+        func, calls = self.failing(*[OperationalError('database is locked')] * 3)
+        with self.assertRaises(OperationalError):
+            retry_on_lock(func)
+        self.assertEqual(len(calls), 3)
+
+        func, calls = self.failing(OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            retry_on_lock(func)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        make_listing(realtor, Location.objects.create(city='Бишкек', district='Центр'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header_and_log(self):
+        with self.assertLogs('request.timing', level='INFO') as logs:
+            response = self.client.get('/api/v1/listings/listings/')
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('view;dur=', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'api/v1/listings/listings/')
+        self.assertEqual(record['db_queries'], 2)
+        self.assertEqual(record['duplicates'], [])
+
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for listing in Listing.objects.all():
+                for _ in range(3):
+                    Location.objects.filter(pk=listing.location_id).first()
+            return HttpResponse()
+
+        middleware = RequestTimingMiddleware(view)
+        with self.assertLogs('request.timing', level='WARNING') as logs:
+            response = middleware(RequestFactory().get('/n-plus-one/'))
+        self.assertIn('n-plus-one;desc="3 repeated queries"', response['Server-Timing'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['duplicates'][0]['count'], 3)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get('/api/v1/listings/listings/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class ListingCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        location = Location.objects.create(city='Бишкек', district='Октябрьский')
+        # Повторяющиеся цены проверяют тай-брейкер по id
+        for i in range(25):
+            make_listing(realtor, location, price=1000 * (i % 4), area=30 + i % 3)
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids, pages
+
+    def test_every_ordering_visits_each_row_once(self):
+        total = Listing.objects.count()
+        for ordering in ('created_at', '-created_at', 'price', '-price', 'area', '-area',
+                         'likes_count', '-likes_count'):
+            ids, _ = self.walk(f'/api/v1/listings/listings/?ordering={ordering}&page_size=7')
+            self.assertEqual(len(ids), total, ordering)
+            self.assertEqual(len(set(ids)), total, ordering)
+
+    def test_previous_link_returns_previous_page(self):
+        _, pages = self.walk('/api/v1/listings/listings/?ordering=price&page_size=10')
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+
+    def test_filters_apply_with_cursor(self):
+        ids, _ = self.walk('/api/v1/listings/listings/?price__gte=2000&ordering=-price&page_size=3')
+        expected = Listing.objects.filter(price__gte=2000).count()
+        self.assertEqual(len(set(ids)), expected)
+
+    def test_cursor_with_malformed_value_is_not_found(self):
+        for ordering, value in (('price', 'дорого'), ('-created_at', 'вчера'), ('likes_count', [1])):
+            payload = {'o': ordering, 'v': value, 'id': 1, 'r': 0}
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get('/api/v1/listings/listings/', {'ordering': ordering, 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, ordering)
+
+
+class ListingSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.location = Location.objects.create(city='Бишкек', district='Октябрьский')
+
+    def search(self, query, **params):
+        response = self.client.get('/api/v1/listings/listings/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_morphology_and_ranking(self):
+        in_title = make_listing(self.realtor, self.location, title='Квартира у парка')
+        in_description = make_listing(self.realtor, self.location, title='Дом', description='Рядом с квартирами')
+        make_listing(self.realtor, self.location, title='Офис')
+        self.assertEqual(self.search('квартиры'), [in_title.pk, in_description.pk])
+
+    def test_kyrgyz_affixes(self):
+        listing = make_listing(self.realtor, self.location, title='Батирлер сатылат')
+        self.assertEqual(self.search('батир'), [listing.pk])
+
+    def test_deactivated_listing_leaves_index(self):
+        listing = make_listing(self.realtor, self.location, title='Студия')
+        listing.is_active = False
+        listing.save()
+        self.assertEqual(self.search('студия'), [])
+
+    def test_combines_with_filters(self):
+        make_listing(self.realtor, self.location, title='Квартира', deal_type='sale')
+        rent = make_listing(self.realtor, self.location, title='Квартира', deal_type='rent')
+        self.assertEqual(self.search('квартира', deal_type='rent'), [rent.pk])
+
+    def test_query_without_terms_is_ignored(self):
+        listing = make_listing(self.realtor, self.location, title='Квартира')
+        for query in ('в', '"', '*'):
+            self.assertEqual(self.search(query), [listing.pk])
+
+    def vm_steps(self, query):
+        # Шаги виртуальной машины SQLite (по 1000): детерминированная мера стоимости запросов
+        steps = []
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(lambda: steps.append(1), 1000)
+        try:
+            self.search(query)
+        finally:
+            connection.connection.set_progress_handler(None, 1000)
+        return len(steps)
+
+    def test_ranking_cost_grows_linearly(self):
+        for _ in range(150):
+            make_listing(self.realtor, self.location, title='Квартира')
+        small = self.vm_steps('квартира')
+        for _ in range(150):
+            make_listing(self.realtor, self.location, title='Квартира')
+        # Вдвое больше совпадений — примерно вдвое дороже, а не вчетверо
+        large = self.vm_steps('квартира')
+        self.assertLess(large, small * 3)
+
+
+class ListingBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.admin = User.objects.create_user(username='admin', password='x', role='admin')
+        location = Location.objects.create(city='Бишкек', district='Центр')
+        cls.listings = [make_listing(cls.realtor, location, title=f'Квартира {number}') for number in range(5)]
+        cls.hidden = make_listing(cls.realtor, location, is_active=False)
+        for listing in cls.listings:
+            ListingImage.objects.create(listing=listing, image='listing_images/x.jpg')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def batch(self, ids, **params):
+        return self.client.get('/api/v1/listings/listings/batch/', {'ids': ','.join(map(str, ids)), **params})
+
+    def test_order_missing_and_inactive_in_fixed_queries(self):
+        ids = [self.listings[3].pk, 999999, self.hidden.pk, self.listings[0].pk, self.listings[3].pk]
+        with self.assertNumQueries(2):
+            response = self.batch(ids)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.listings[3].pk, self.listings[0].pk])
+        self.assertEqual(response.data['missing'], [999999])
+        self.assertEqual(response.data['inactive'], [self.hidden.pk])
+        self.assertEqual(len(response.data['results'][0]['images']), 1)
+
+        with self.assertNumQueries(2):
+            self.batch([listing.pk for listing in self.listings])
+
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.batch([self.hidden.pk]).data['inactive'], [])
+
+    def test_sparse_fields_and_validation(self):
+        response = self.batch([self.listings[1].pk], fields='id,title')
+        self.assertEqual(response.data['results'], [{'id': self.listings[1].pk, 'title': 'Квартира 1'}])
+        self.assertEqual(self.batch(['x']).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/listings/listings/batch/').status_code, 400)
+        with override_settings(LISTING_BATCH_MAX_IDS=2):
+            self.assertEqual(self.batch([1, 2, 3]).status_code, 400)
+
+
+class PopularityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        location = Location.objects.create(city='Бишкек', district='Центр')
+        cls.first, cls.second, cls.quiet = [make_listing(cls.realtor, location) for _ in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def score(self, listing):
+        listing.refresh_from_db(fields=['popularity'])
+        return listing.popularity
+
+    def test_events_update_score_and_trending_feed(self):
+        like_url = f'/api/v1/listings/listings/{self.first.pk}/like/'
+        self.client.post(like_url)
+        self.client.post(like_url, REMOTE_ADDR='10.0.0.2')
+        self.client.post('/api/v1/listings/applications/', {
+            'listing': self.second.pk, 'contact_phone': '+996555000000',
+        })
+        self.assertEqual((self.score(self.first), self.score(self.second)), (2.0, 3.0))
+        self.client.post(like_url)
+        self.assertEqual(self.score(self.first), 1.0)
+
+        response = self.client.get('/api/v1/listings/listings/trending/')
+        self.assertEqual([row['id'] for row in response.data], [self.second.pk, self.first.pk])
+        self.assertEqual(response.data[0]['popularity'], 3.0)
+        # В деталке счёта нет: её ETag не зависит от заявок и затухания
+        self.assertNotIn('popularity', self.client.get(f'/api/v1/listings/listings/{self.second.pk}/').data)
+
+    def test_decay_halves_per_half_life_and_drops_small_scores(self):
+        Listing.objects.filter(pk=self.first.pk).update(popularity=8)
+        Listing.objects.filter(pk=self.second.pk).update(popularity=0.015)
+        started = 1_000_000
+        self.assertEqual(popularity.decay(now=started), 0)
+        popularity.decay(now=started + 24 * 3600)
+        self.assertAlmostEqual(self.score(self.first), 4.0)
+        self.assertEqual(JobState.read(popularity.CLOCK), started + 24 * 3600)
+        self.assertEqual(self.score(self.second), 0)
+
+    def test_unlike_withdraws_only_the_decayed_weight(self):
+        like_url = f'/api/v1/listings/listings/{self.first.pk}/like/'
+        self.client.post(like_url)
+        weeks_ago = timezone.now() - timedelta(days=14)
+        ListingLike.objects.filter(listing=self.first).update(created_at=weeks_ago)
+        # Две недели затуханий: от лайка в счёте ничего не осталось, свежая заявка даёт 3.0
+        popularity.decay(now=weeks_ago.timestamp())
+        popularity.decay(now=timezone.now().timestamp())
+        self.assertEqual(self.score(self.first), 0)
+        Application.objects.create(listing=self.first, contact_phone='+996555000000')
+        self.assertEqual(self.score(self.first), 3.0)
+
+        self.client.post(like_url)
+        self.assertAlmostEqual(self.score(self.first), 3.0, places=3)
+
+    def test_rebuild_from_event_dates(self):
+        ListingLike.objects.create(listing=self.first, ip_address='10.0.0.1')
+        ListingLike.objects.create(listing=self.second, ip_address='10.0.0.1')
+        ListingLike.objects.filter(listing=self.second).update(created_at=timezone.now() - timedelta(hours=48))
+        Listing.objects.filter(pk=self.quiet.pk).update(popularity=5)
+        call_command('decay_popularity', rebuild=True, stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.first), 1.0, places=3)
+        self.assertAlmostEqual(self.score(self.second), 0.25, places=3)
+        self.assertEqual(self.score(self.quiet), 0)
+
+
+class SimilarListingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.center = Location.objects.create(city='Бишкек', district='Центр')
+        cls.south = Location.objects.create(city='Бишкек', district='Южные микрорайоны')
+
+    def listing(self, price, rooms=2, area=60, location=None, **kwargs):
+        return make_listing(self.realtor, location or self.center, price=price, rooms=rooms, area=area, **kwargs)
+
+    def similar(self, listing):
+        response = self.client.get(f'/api/v1/listings/listings/{listing.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_nearest_matches_brute_force(self):
+        rows = [(pk, 30000 + (pk * 7919) % 90000, pk % 5 + 1, 30 + (pk * 31) % 90) for pk in range(1, 300)]
+        points = {pk: similar.vector(price, rooms, area) for pk, price, rooms, area in rows}
+        neighbors = similar.nearest(rows, 5)
+        for pk, point in points.items():
+            distances = sorted(
+                (sum((a - b) ** 2 for a, b in zip(point, other)), other_pk)
+                for other_pk, other in points.items() if other_pk != pk
+            )
+            self.assertEqual(neighbors[pk], [other_pk for _, other_pk in distances[:5]])
+
+    def test_endpoint_uses_precomputed_neighbors(self):
+        target = self.listing(50000)
+        close, farther = self.listing(52000), self.listing(70000, rooms=3)
+        self.listing(50000, location=self.south)
+        self.listing(50000, deal_type='rent')
+        hidden = self.listing(50500)
+        hidden.is_active = False
+        hidden.save()
+        call_command('build_similar_listings', stdout=StringIO())
+
+        with self.assertNumQueries(3):
+            self.assertEqual(self.similar(target), [close.pk, farther.pk])
+        self.assertEqual(self.client.get('/api/v1/listings/listings/999999/similar/').status_code, 404)
+
+    def test_refresh_updates_only_changed_groups(self):
+        target = self.listing(50000)
+        other = self.listing(90000, location=self.south)
+        call_command('build_similar_listings', stdout=StringIO())
+        self.assertEqual(self.similar(target), [])
+
+        moved = self.listing(51000, location=self.south)
+        self.assertEqual(self.similar(moved), [])
+        call_command('build_similar_listings', stdout=StringIO())
+        self.assertEqual(self.similar(other), [moved.pk])
+
+        moved.location = self.center
+        moved.save()
+        self.assertEqual(similar.refresh(), (2, 3))
+        self.assertEqual((self.similar(target), self.similar(other)), ([moved.pk], []))
+        self.assertEqual(JobState.read(similar.CLOCK), sync.current_seq())
+
+
+class LocationTreeAndAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.center = Location.objects.create(city='Бишкек', district='Центр')
+        cls.south = Location.objects.create(city='Бишкек', district='Южные микрорайоны')
+        cls.osh = Location.objects.create(city='Ош', district='Центр')
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index = autocomplete.AutocompleteIndex()
+
+    def suggest(self, query, **params):
+        response = self.client.get('/api/v1/listings/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['value'], row.get('city')) for row in response.data['results']]
+
+    def test_tree_groups_districts_and_revalidates(self):
+        response = self.client.get('/api/v1/listings/locations/tree/')
+        self.assertEqual([row['city'] for row in response.data['cities']], ['Бишкек', 'Ош'])
+        self.assertEqual(
+            [row['district'] for row in response.data['cities'][0]['districts']], ['Центр', 'Южные микрорайоны'],
+        )
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/v1/listings/locations/tree/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        Location.objects.create(city='Каракол', district='Центр')
+        response = self.client.get('/api/v1/listings/locations/tree/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Каракол', [row['city'] for row in response.data['cities']])
+
+    def test_places_then_addresses_by_word_prefix(self):
+        make_listing(self.realtor, self.center, address='ул. Киевская, 1')
+        make_listing(self.realtor, self.center, address='ул. Киевская, 1')
+        make_listing(self.realtor, self.osh, address='пр. Чуй, 10')
+        self.assertEqual(self.suggest('юж'), [('district', 'Южные микрорайоны', 'Бишкек')])
+        self.assertEqual(self.suggest('киев'), [('address', 'ул. Киевская, 1', 'Бишкек')])
+        self.assertEqual(self.client.get('/api/v1/listings/autocomplete/', {'q': 'киев'}).data['results'][0]['listings'], 2)
+        self.assertEqual(self.suggest('центр', city='ош'), [('district', 'Центр', 'Ош')])
+        self.assertEqual(self.suggest('1'), [])
+
+    def test_index_follows_listing_changes(self):
+        listing = make_listing(self.realtor, self.center, address='ул. Киевская, 1')
+        self.assertEqual(len(self.suggest('киев')), 1)
+        # Уже загруженный индекс догоняет изменения по change_seq
+        with self.assertNumQueries(0):
+            self.suggest('киев')
+
+        listing.address = 'ул. Токтогула, 5'
+        listing.save()
+        self.assertEqual(self.suggest('киев'), [])
+        self.assertEqual(self.suggest('токт'), [('address', 'ул. Токтогула, 5', 'Бишкек')])
+        listing.delete()
+        self.assertEqual(self.suggest('токт'), [])
+
+    @override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0)
+    def test_index_sees_locations_changed_by_other_workers(self):
+        make_listing(self.realtor, self.center, address='ул. Киевская, 1')
+        self.assertEqual(self.suggest('киев'), [('address', 'ул. Киевская, 1', 'Бишкек')])
+        # update() не шлёт сигналов — как правка из другого воркера с локальным кэшем
+        Location.objects.filter(pk=self.center.pk).update(city='Чолпон-Ата', district='Набережная')
+        self.assertEqual(self.suggest('набер'), [('district', 'Набережная', 'Чолпон-Ата')])
+        self.assertEqual(self.suggest('киев'), [('address', 'ул. Киевская, 1', 'Чолпон-Ата')])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_tree_is_kept_briefly_in_local_cache(self):
+        with mock.patch('apps.listings.views.cache.set', wraps=cache.set) as cache_set:
+            self.client.get('/api/v1/listings/locations/tree/')
+        self.assertEqual(cache_set.call_args.args[2], settings.RESPONSE_CACHE_TTL)
+
+
+def png_upload(name='photo.png', size=(64, 48)):
+    output = BytesIO()
+    Image.new('RGBA', size, (200, 10, 10, 255)).save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+@override_settings(LISTING_IMAGE_ASYNC=False)
+class ListingImagePipelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        cls.listing = make_listing(realtor, Location.objects.create(city='Бишкек', district='Центр'))
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_upload_is_stored_as_is_and_converted_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            image = ListingImage.objects.create(listing=self.listing, image=png_upload())
+        self.assertEqual(image.status, ListingImage.STATUS_PENDING)
+        self.assertTrue(image.image.name.endswith('.png'))
+        source_name = image.image.name
+
+        for callback in callbacks:
+            callback()
+        image.refresh_from_db()
+        self.assertEqual(image.status, ListingImage.STATUS_READY)
+        self.assertTrue(image.image.name.endswith('.webp'))
+        self.assertFalse(image.image.storage.exists(source_name))
+
+        response = self.client.get(f'/api/v1/listings/listings/{self.listing.pk}/')
+        self.assertEqual(response.data['images'][0]['status'], ListingImage.STATUS_READY)
+
+    def test_broken_upload_is_marked_failed(self):
+        broken = SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ListingImage.objects.create(listing=self.listing, image=broken)
+        image.refresh_from_db()
+        self.assertEqual(image.status, ListingImage.STATUS_FAILED)
+        self.assertTrue(image.processing_error)
+
+    def test_photo_replaced_during_processing_is_converted(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            image = ListingImage.objects.create(listing=self.listing, image=png_upload())
+
+        def render(data, widths, convert):
+            # Фото заменили, пока воркер держал старое в processing
+            stale = ListingImage.objects.get(pk=image.pk)
+            stale.image = png_upload('new.png')
+            stale.save()
+            return render_image(data, widths, convert)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(process_image(image.pk, render=render))
+        image.refresh_from_db()
+        self.assertEqual(image.status, ListingImage.STATUS_READY)
+        self.assertTrue(os.path.basename(image.image.name).startswith('new'))
+        self.assertEqual(image.variants['source'], image.image.name)
+
+    def test_storage_error_marks_failed(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            image = ListingImage.objects.create(listing=self.listing, image=png_upload(size=(800, 600)))
+        with mock.patch('django.core.files.storage.FileSystemStorage.save', side_effect=OSError('disk full')):
+            self.assertFalse(process_image(image.pk))
+        image.refresh_from_db()
+        self.assertEqual((image.status, image.processing_error), (ListingImage.STATUS_FAILED, 'disk full'))
+
+    def test_conversion_runs_in_process_pool(self):
+        pipeline = ImagePipeline(workers=1)
+        pipeline.start()
+        try:
+            original, variants = pipeline.render(png_upload(size=(800, 600)).read(), [320, 1280], True)
+        finally:
+            pipeline.shutdown()
+        self.assertEqual(Image.open(BytesIO(original)).format, 'WEBP')
+        # 1280 шире исходника — апскейла нет
+        self.assertEqual(list(variants), [320])
+        self.assertEqual(Image.open(BytesIO(variants[320])).size, (320, 240))
+
+    def test_variants_are_shared_and_built_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = ListingImage.objects.create(listing=self.listing, image=png_upload(size=(1000, 500)))
+            second = ListingImage.objects.create(listing=self.listing, image=png_upload(size=(1000, 500)))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.variants['source'], first.image.name)
+        self.assertEqual(sorted(first.variants['sizes']), ['320', '640'])
+        self.assertEqual(first.variants['sizes'], second.variants['sizes'])
+
+        # Повторное сохранение без нового исходника не ставит фото в очередь
+        first.save()
+        self.assertEqual(first.status, ListingImage.STATUS_READY)
+
+        response = self.client.get('/api/v1/listings/listings/')
+        card_image = response.data['results'][0]['images'][0]
+        self.assertNotIn('image', card_image)
+        self.assertTrue(card_image['thumbnail'].endswith('_320w.webp'))
+        self.assertEqual(sorted(card_image['srcset']), ['320w', '640w'])
+
+
+FEED_CSV = """external_id,title,description,price,rooms,area,city,district,address,deal_type,latitude,longitude,images
+a-1,Квартира у парка,Светлая,55000,2,54,Бишкек,Новый район,ул. Киевская 1,sale,42.87,74.57,
+a-2,Студия,Уютная,не число,1,30,Бишкек,Центр,ул. Чуй 5,sale,,,
+a-3,Дом,С садом,120000,5,180,Ош,Центр,ул. Ленина 3,sale,,,
+"""
+
+FEED_XML = """<listings>
+  <listing>
+    <external_id>x-1</external_id><title>Пентхаус</title><description>С видом</description>
+    <price>300000</price><rooms>4</rooms><area>150</area><city>Бишкек</city><district>Центр</district>
+    <address>ул. Токтогула 9</address><deal_type>sale</deal_type>
+    <images><image>https://cdn.example.com/1.png</image><image>https://cdn.example.com/broken.png</image></images>
+  </listing>
+</listings>
+"""
+
+
+@override_settings(LISTING_IMAGE_ASYNC=False)
+class ListingImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='x', role='realtor')
+        Location.objects.create(city='Бишкек', district='Центр')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.realtor)
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, content, name='feed.csv'):
+        feed = SimpleUploadedFile(name, content.encode(), content_type='text/csv')
+        return self.client.post('/api/v1/listings/listings/import/', {'file': feed}, format='multipart')
+
+    def test_csv_upsert_by_external_id(self):
+        report = self.upload(FEED_CSV).data
+        self.assertEqual((report['created'], report['failed']), (2, 1))
+        self.assertEqual(report['errors'][0]['row'], 2)
+        self.assertIn('price', report['errors'][0]['errors'])
+        listing = Listing.objects.get(external_id='a-1')
+        self.assertEqual((listing.location.district, listing.geohash[:4]), ('Новый район', 'txt5'))
+        self.assertEqual(self.client.get('/api/v1/listings/listings/?search=парка').data['results'][0]['id'], listing.pk)
+        self.assertEqual(DailyStats.objects.get().listings_created, 2)
+
+        report = self.upload(FEED_CSV.replace('55000', '57000')).data
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (0, 1, 1))
+        listing.refresh_from_db()
+        self.assertEqual(listing.price, 57000)
+        self.assertEqual(Listing.objects.count(), 2)
+
+    def test_xml_feed_with_images(self):
+        def fetch(url):
+            if 'broken' in url:
+                return b'<html>not found</html>'
+            return png_upload().read()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = importer.import_feed(self.realtor, BytesIO(FEED_XML.encode()), 'xml', fetch=fetch)
+        self.assertEqual((report.created, report.images, report.failed), (1, 1, 0))
+        self.assertIn('broken.png', report.errors[0]['errors'][0])
+        self.assertIn('не является изображением', report.errors[0]['errors'][0])
+        image = ListingImage.objects.get()
+        self.assertEqual(image.status, ListingImage.STATUS_READY)
+        self.assertTrue(image.image.name.endswith('.webp'))
+
+    def test_private_image_hosts_are_rejected(self):
+        with self.assertRaises(ValueError):
+            importer.check_url('http://127.0.0.1/admin.png')
+        with self.assertRaises(ValueError):
+            importer.check_url('file:///etc/passwd')
+
+    def test_connection_checks_actual_peer_address(self):
+        # Имя могло пройти check_url, но при подключении указать на внутренний адрес
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        try:
+            with self.assertRaises(ValueError):
+                importer.connect_public(server.getsockname(), timeout=1)
+        finally:
+            server.close()
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        call_command(
+            'seed_demo_data', listings=30, likes=60, applications=10, realtors=2, admins=1,
+            images_per_listing=1, stdout=StringIO(),
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_seed_creates_consistent_data(self):
+        self.assertEqual(Listing.objects.count(), 30)
+        self.assertEqual(ListingImage.objects.filter(status=ListingImage.STATUS_READY).count(), 30)
+        self.assertEqual(Listing.objects.sync_likes_count(), 0)
+        self.assertEqual(Application.objects.count(), 10)
+
+    def test_benchmark_fails_on_baseline_regression(self):
+        baseline = Path(self.media_root) / 'baseline.json'
+        scenarios = ['listings:list', 'listings:detail', 'applications:create']
+        call_command('benchmark_api', requests=3, only=scenarios, baseline=baseline, save_baseline=True, stdout=StringIO())
+        results = json.loads(baseline.read_text())
+        self.assertEqual(sorted(results), sorted(scenarios))
+        self.assertTrue(all(row['errors'] == 0 for row in results.values()))
+
+        results['listings:detail']['queries'] = 0
+        baseline.write_text(json.dumps(results))
+        with self.assertRaisesMessage(CommandError, 'listings:detail: SQL-запросов 0'):
+            call_command('benchmark_api', requests=3, only=scenarios, baseline=baseline, stdout=StringIO())
@@ -1,26 +1,48 @@
 from django.urls import path
 from .views import (
     ListingListCreateView,
+    ListingFacetsView,
+    ListingTrendingView,
+    ListingClustersView,
+    ListingSyncView,
+    ListingBatchView,
+    ListingSimilarView,
     ListingRetrieveUpdateDestroyView,
     MyListingsView,
     ListingLikeToggleView,
     LocationListView,
+    LocationTreeView,
+    AutocompleteView,
     LocationCreateView,
     ApplicationListCreateView,
     MyApplicationsView,
+    ListingExportView,
+    ListingImportView,
+    ApplicationExportView,
     admin_stats
 )
 
 urlpatterns = [
     path('locations/list/', LocationListView.as_view()),
     path('locations/create/', LocationCreateView.as_view()),
+    path('locations/tree/', LocationTreeView.as_view()),
+    path('autocomplete/', AutocompleteView.as_view()),
     path('listings/', ListingListCreateView.as_view()),
+    path('listings/facets/', ListingFacetsView.as_view()),
+    path('listings/trending/', ListingTrendingView.as_view()),
+    path('listings/clusters/', ListingClustersView.as_view()),
+    path('listings/sync/', ListingSyncView.as_view()),
+    path('listings/batch/', ListingBatchView.as_view()),
     path('listings/<int:pk>/', ListingRetrieveUpdateDestroyView.as_view()),
     path('listings/<int:pk>/like/', ListingLikeToggleView.as_view()),
+    path('listings/<int:pk>/similar/', ListingSimilarView.as_view()),
     path('listings/my/', MyListingsView.as_view()),
+    path('listings/export/', ListingExportView.as_view()),
+    path('listings/import/', ListingImportView.as_view()),
 
     path('applications/', ApplicationListCreateView.as_view()),
     path('applications/my/', MyApplicationsView.as_view()),
+    path('applications/export/', ApplicationExportView.as_view()),
 
     path('admin/stats/', admin_stats),
 ]
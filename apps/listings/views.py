@@ -1,15 +1,31 @@
-from rest_framework import generics, permissions, filters, status
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from django.db.models import Count
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.core.cache import cache
+from django.conf import settings
 from datetime import timedelta
-
-from .models import Listing, Location, Application, ListingLike
-from .serializers import ListingSerializer, LocationSerializer, ApplicationSerializer
+import csv
+import time
+from xml.etree.ElementTree import ParseError
+
+from .models import Listing, Location, Application, ListingLike, DailyStats
+from .serializers import (
+    ListingSerializer, ListingListSerializer, LocationSerializer, ApplicationSerializer, TrendingListingSerializer,
+)
+from .pagination import ListingCursorPagination
+from .filters import LISTING_FILTER_FIELDS, ListingGeoFilter, ListingSearchFilter, ListingOrderingFilter
+from . import autocomplete, conditional, export, facets, geo, importer, popularity, similar, sync
+from .fieldsets import SparseFieldsMixin
+from . import response_cache
+from .response_cache import CachedListMixin
 from apps.users.models import User
+from core.sqlite import retry_on_lock
 
 
 # ─── Права ───────────────────────────────────────────────
@@ -26,84 +42,394 @@ class IsAdminOrRealtor(permissions.BasePermission):
 
 
 # ─── Локации ──────────────────────────────────────────────
-class LocationListView(generics.ListAPIView):
+class LocationListView(CachedListMixin, generics.ListAPIView):
+    replica_reads = True
+    cache_namespace = 'locations'
+    cache_depends_on = ('locations',)
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [permissions.AllowAny]
-    
+
+
+class LocationTreeView(APIView):
+    """
+    Дерево город → районы для выпадающих списков. Хранится в кэше до изменения
+    локаций; version меняется вместе с ним, повторный запрос с ETag получает 304.
+    """
+    permission_classes = [permissions.AllowAny]
+    replica_reads = True
+    cache_depends_on = ('locations',)
+
+    def get(self, request):
+        key = response_cache.make_key(request, self.cache_depends_on)
+        entry = cache.get(key)
+        if entry is None:
+            with response_cache.fill_source(self.cache_depends_on):
+                data = self.build()
+            entry = (data, conditional.data_etag(data), int(time.time()))
+            # Ключ с поколением локаций сам устаревает при их изменении, но поколение
+            # общее для воркеров только в общем кэше — в локальном держим недолго
+            ttl = settings.LOCATION_TREE_CACHE_TTL if settings.SHARED_CACHE else settings.RESPONSE_CACHE_TTL
+            cache.set(key, entry, ttl)
+        data, etag, modified = entry
+        response = conditional.not_modified(request, etag, modified) or Response(data)
+        return conditional.apply_headers(request, response, etag, modified)
+
+    def build(self):
+        cities = {}
+        for pk, city, district in Location.objects.order_by('city', 'district').values_list('id', 'city', 'district'):
+            cities.setdefault(city, []).append({'id': pk, 'district': district})
+        return {
+            'version': response_cache.get_generations(self.cache_depends_on)[0],
+            'cities': [{'city': city, 'districts': districts} for city, districts in cities.items()],
+        }
+
+
+class AutocompleteView(APIView):
+    """
+    Подсказки по префиксу: ?q=киев[&city=Бишкек][&limit=10]. Сначала города и районы,
+    затем адреса объявлений с числом активных объявлений по адресу.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', autocomplete.DEFAULT_LIMIT))
+        except ValueError:
+            limit = autocomplete.DEFAULT_LIMIT
+        limit = min(limit, autocomplete.MAX_LIMIT) if limit > 0 else autocomplete.DEFAULT_LIMIT
+        results = autocomplete.index.suggest(
+            request.query_params.get('q', ''), limit, request.query_params.get('city'),
+        )
+        return Response({'results': results})
+
+
 class LocationCreateView(generics.CreateAPIView):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 # ─── Объявления ───────────────────────────────────────────
-class ListingListCreateView(generics.ListCreateAPIView):
+class ListingListCreateView(CachedListMixin, SparseFieldsMixin, generics.ListCreateAPIView):
+    replica_reads = True
+    cache_namespace = 'listings'
+    cache_depends_on = ('listings', 'locations')
     serializer_class = ListingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'location__city': ['exact'],
-        'location__district': ['exact'],
-        'deal_type': ['exact'],
-        'price': ['gte', 'lte'],
-        'rooms': ['exact'],
-        'area': ['gte', 'lte'],
-    }
-    search_fields = ['title', 'description', 'address']
+    pagination_class = ListingCursorPagination
+    filter_backends = [DjangoFilterBackend, ListingGeoFilter, ListingSearchFilter, ListingOrderingFilter]
+    filterset_fields = LISTING_FILTER_FIELDS
+    # popularity сюда не входит: затухание меняет все значения сразу, и курсор по нему
+    # дал бы повторы и пропуски между страницами — для этого есть /listings/trending/
     ordering_fields = ['price', 'created_at', 'area', 'likes_count']
 
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return ListingListSerializer
+        return ListingSerializer
+
     def get_queryset(self):
-        qs = Listing.objects.annotate(likes_count=Count('likes'))
+        qs = self.api_queryset(Listing.objects.all())
         if self.request.user.is_authenticated and self.request.user.role == 'admin':
             return qs
-        return qs.filter(is_active=True)
+        return qs.active()
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class ListingRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Listing.objects.all()
+class ListingTrendingView(CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
+    """
+    «Популярное сейчас»: TRENDING_SIZE активных объявлений с наибольшим затухающим
+    счётом лайков и заявок (popularity.py). Кэшируется как лента: новые лайки
+    попадают в выдачу не позже чем через RESPONSE_CACHE_TTL.
+    """
+    replica_reads = True
+    cache_namespace = 'listings'
+    cache_depends_on = ('listings', 'locations')
+    serializer_class = TrendingListingSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    sparse_keep = ('popularity',)
+
+    def get_queryset(self):
+        queryset = Listing.objects.active().filter(popularity__gt=0).order_by('-popularity', '-id')
+        return self.api_queryset(queryset)[:settings.TRENDING_SIZE]
+
+
+class ListingFacetsView(APIView):
+    """
+    Счётчики для фильтров ленты: те же параметры, что у /listings/.
+    Выдача без фильтров (самая частая) кэшируется до изменения объявлений.
+    """
+    permission_classes = [permissions.AllowAny]
+    replica_reads = True
+    cache_depends_on = ('listings', 'locations')
+
+    def get(self, request):
+        queryset = Listing.objects.all()
+        if not (request.user.is_authenticated and request.user.role == 'admin'):
+            queryset = queryset.active()
+
+        cacheable = response_cache.is_cacheable(request) and not facets.is_filtered(request.query_params)
+        if not cacheable:
+            return Response(facets.collect_facets(queryset, request.query_params))
+
+        key = response_cache.make_key(request, self.cache_depends_on)
+        data = cache.get(key)
+        if data is not None:
+            response_cache.record('facets', 'hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        with response_cache.fill_source(self.cache_depends_on):
+            data = facets.collect_facets(queryset, request.query_params)
+        cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+        response_cache.record('facets', 'misses')
+        response = Response(data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ListingClustersView(APIView):
+    """
+    Кластеры маркеров для карты: ?tile=z/x/y или ?bbox=...&zoom=z плюс фильтры ленты.
+    Ячейка с одним объявлением отдаёт его listing_id, чтобы карта сразу показала маркер.
+    """
+    permission_classes = [permissions.AllowAny]
+    replica_reads = True
+    cache_depends_on = ('listings', 'locations')
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            if params.get('tile'):
+                zoom, bbox = geo.parse_tile(params['tile'])
+            else:
+                bbox = geo.parse_bbox(params.get('bbox', ''))
+                zoom = int(params['zoom']) if params.get('zoom', '').isdigit() else -1
+                if not 0 <= zoom <= geo.MAX_ZOOM:
+                    raise ValueError(f'zoom: ожидается целое от 0 до {geo.MAX_ZOOM}')
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cacheable = response_cache.is_cacheable(request)
+        if cacheable:
+            key = response_cache.make_key(request, self.cache_depends_on)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+        queryset = Listing.objects.all()
+        if not (request.user.is_authenticated and request.user.role == 'admin'):
+            queryset = queryset.active()
+        precision = geo.zoom_precision(zoom)
+        with response_cache.fill_source(self.cache_depends_on):
+            rows = list(facets.filtered(queryset.in_bbox(bbox), params, exclude=('bbox',)).clusters(precision))
+        data = {
+            'zoom': zoom,
+            'precision': precision,
+            'clusters': [
+                {
+                    'geohash': row['cell'],
+                    'count': row['count'],
+                    'latitude': round(row['latitude'], 6),
+                    'longitude': round(row['longitude'], 6),
+                    'listing_id': row['listing_id'] if row['count'] == 1 else None,
+                }
+                for row in rows
+            ],
+        }
+        if cacheable:
+            cache.set(key, data, settings.RESPONSE_CACHE_TTL)
+        return Response(data)
+
+
+class ListingSyncView(APIView):
+    """
+    Дельта-синхронизация: ?cursor= из прошлого ответа (без него — все активные объявления)
+    и ?limit= (до 1000). Пока has_more, клиент повторяет запрос с новым cursor.
+    Только primary: курсор с отстающей реплики пропустил бы ещё не дошедшие изменения.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        changed, deleted, cursor, has_more = sync.collect_changes(
+            Listing.objects.for_api(),
+            sync.decode_cursor(request.query_params.get('cursor')),
+            sync.parse_limit(request.query_params.get('limit')),
+        )
+        return Response({
+            'changes': ListingSerializer(changed, many=True, context={'request': request}).data,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+
+class ListingRetrieveUpdateDestroyView(SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ListingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # GET — с реплики; PATCH/DELETE идут на primary (core/replicas.py)
+    replica_reads = True
+    # Из них считаются ETag и Last-Modified
+    sparse_keep = ('change_seq', 'likes_count', 'updated_at')
 
     def perform_destroy(self, instance):
         instance.is_active = False
         instance.save()
 
     def get_queryset(self):
-        return Listing.objects.annotate(likes_count=Count('likes'))
-
-
-class MyListingsView(generics.ListAPIView):
+        return self.api_queryset(Listing.objects.all())
+
+    def retrieve(self, request, *args, **kwargs):
+        if conditional.has_validators(request):
+            # Лёгкая выборка трёх колонок вместо объявления с фото
+            row = Listing.objects.filter(pk=kwargs['pk']).values_list(
+                'change_seq', 'likes_count', 'updated_at'
+            ).first()
+            if row is not None:
+                etag, modified = conditional.listing_validators(kwargs['pk'], *row)
+                response = conditional.not_modified(request, etag, modified)
+                if response is not None:
+                    return conditional.apply_headers(request, response, etag, modified)
+
+        instance = self.get_object()
+        etag, modified = conditional.listing_validators(
+            instance.pk, instance.change_seq, instance.likes_count, instance.updated_at
+        )
+        response = Response(self.get_serializer(instance).data)
+        return conditional.apply_headers(request, response, etag, modified)
+
+
+def parse_ids(value):
+    """?ids=5,3,9 → [5, 3, 9] без повторов, в исходном порядке."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in (value or '').split(',') if part.strip()))
+    except ValueError:
+        raise ValidationError({'ids': 'Ожидаются целые id через запятую'})
+    if not ids:
+        raise ValidationError({'ids': 'Укажите хотя бы один id'})
+    if len(ids) > settings.LISTING_BATCH_MAX_IDS:
+        raise ValidationError({'ids': f'Не больше {settings.LISTING_BATCH_MAX_IDS} id за запрос'})
+    return ids
+
+
+class ListingBatchView(SparseFieldsMixin, generics.GenericAPIView):
+    """
+    Несколько объявлений одним запросом для избранного и сравнения: ?ids=5,3,9.
+    results — в порядке ids; ненайденные (missing) и снятые с публикации (inactive)
+    id перечисляются отдельно. Два SQL-запроса на любое число id: объявления с
+    локацией и их фото. Работают ?fields= / ?omit=.
+    """
     serializer_class = ListingSerializer
+    permission_classes = [permissions.AllowAny]
+    replica_reads = True
+    sparse_keep = ('is_active',)
+
+    def get(self, request):
+        ids = parse_ids(request.query_params.get('ids'))
+        listings = {listing.pk: listing for listing in self.api_queryset(Listing.objects.filter(pk__in=ids))}
+        # Админ, как и в ленте, видит снятые объявления
+        show_inactive = request.user.is_authenticated and request.user.role == 'admin'
+
+        found, missing, inactive = [], [], []
+        for pk in ids:
+            listing = listings.get(pk)
+            if listing is None:
+                missing.append(pk)
+            elif listing.is_active or show_inactive:
+                found.append(listing)
+            else:
+                inactive.append(pk)
+        return Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': missing,
+            'inactive': inactive,
+        })
+
+
+class ListingSimilarView(SparseFieldsMixin, generics.GenericAPIView):
+    """
+    Похожие объявления: тот же тип сделки и район, близкие цена, комнаты и площадь.
+    Соседи посчитаны заранее (similar.py, команда build_similar_listings): ответ —
+    чтение одной строки и выборка объявлений по id. Новое объявление получает
+    соседей при следующем запуске команды, до этого список пуст.
+    """
+    serializer_class = ListingListSerializer
+    permission_classes = [permissions.AllowAny]
+    replica_reads = True
+    sparse_keep = ()
+
+    def get(self, request, pk):
+        ids = similar.neighbor_ids(pk)
+        if ids is None:
+            if not Listing.objects.filter(pk=pk).exists():
+                raise NotFound()
+            ids = []
+        listings = {}
+        if ids:
+            # Соседи, снятые с публикации после расчёта, пропускаются
+            queryset = self.api_queryset(Listing.objects.active().filter(pk__in=ids))
+            listings = {listing.pk: listing for listing in queryset}
+        found = [listings[neighbor] for neighbor in ids if neighbor in listings]
+        return Response({'results': self.get_serializer(found, many=True).data})
+
+
+class MyListingsView(SparseFieldsMixin, generics.ListAPIView):
+    serializer_class = ListingListSerializer
     permission_classes = [permissions.IsAuthenticated, IsRealtor]
 
     def get_queryset(self):
-        return Listing.objects.filter(owner=self.request.user).annotate(likes_count=Count('likes'))
+        return self.api_queryset(Listing.objects.filter(owner=self.request.user))
 
 
 class ListingLikeToggleView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request, pk):
+        ip = self.get_client_ip(request)
+        liked = False
         try:
-            listing = Listing.objects.get(pk=pk)
+            liked = retry_on_lock(lambda: self.toggle(pk, ip))
         except Listing.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        ip = self.get_client_ip(request)
-        like, created = ListingLike.objects.get_or_create(listing=listing, ip_address=ip)
-
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
-
-        count = ListingLike.objects.filter(listing=listing).count()
+        except IntegrityError:
+            # Уникальный индекс: параллельный запрос с того же IP успел поставить лайк.
+            # Если лайка нет, ошибка о другом — удалённое объявление уйдёт в 404 ниже
+            liked = ListingLike.objects.filter(listing_id=pk, ip_address=ip).exists()
+            if not liked and Listing.objects.filter(pk=pk).exists():
+                raise
+
+        count = Listing.objects.filter(pk=pk).values_list('likes_count', flat=True).first()
+        if count is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         return Response({'liked': liked, 'likes_count': count}, status=200)
 
+    def toggle(self, pk, ip):
+        with transaction.atomic():
+            # Дата лайка нужна, чтобы снять из счёта популярности уже затухший вес
+            likes = ListingLike.objects.filter(listing_id=pk, ip_address=ip)
+            created_at = likes.values_list('created_at', flat=True).first()
+            if created_at is None:
+                # Уникальный индекс (listing, ip_address) не даст поставить лайк дважды
+                ListingLike.objects.create(listing_id=pk, ip_address=ip)
+                liked, change = True, popularity.delta('like')
+            else:
+                deleted, _ = likes.delete()
+                if not deleted:
+                    # Параллельный запрос с того же IP уже снял этот лайк
+                    return False
+                liked, change = False, popularity.withdraw('like', created_at)
+            # Счёт популярности — тем же UPDATE, что и счётчик
+            updated = Listing.objects.filter(pk=pk).update(
+                likes_count=F('likes_count') + (1 if liked else -1), popularity=change,
+            )
+            if not updated:
+                raise Listing.DoesNotExist
+        return liked
+
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
@@ -111,6 +437,66 @@ class ListingLikeToggleView(APIView):
         return request.META.get('REMOTE_ADDR', '')
 
 
+# ─── Выгрузка ─────────────────────────────────────────────
+class ExportView(APIView):
+    """
+    Потоковая выгрузка ?as=csv (по умолчанию) или ?as=ndjson.
+    Риелтор получает свои данные, администратор — все.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrRealtor]
+
+    def get(self, request):
+        fmt = request.query_params.get('as', 'csv')
+        if fmt not in export.FORMATS:
+            return Response(
+                {'as': f'Допустимые значения: {", ".join(export.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user = request.user
+        return self.export(self.get_queryset(user, user.role == 'admin' or user.is_staff), fmt)
+
+
+class ListingExportView(ExportView):
+    def get_queryset(self, user, is_admin):
+        return Listing.objects.all() if is_admin else Listing.objects.filter(owner=user)
+
+    def export(self, queryset, fmt):
+        return export.export_listings(queryset, fmt)
+
+
+class ApplicationExportView(ExportView):
+    def get_queryset(self, user, is_admin):
+        return Application.objects.all() if is_admin else Application.objects.filter(listing__owner=user)
+
+    def export(self, queryset, fmt):
+        return export.export_applications(queryset, fmt)
+
+
+# ─── Импорт ───────────────────────────────────────────────
+class ListingImportView(APIView):
+    """
+    Массовая загрузка фида (поле file, CSV или XML) от имени текущего риелтора.
+    Формат берётся из ?as= или из расширения файла. Ответ — отчёт импорта.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrRealtor]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'Файл фида обязателен'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get('as') or importer.detect_format(upload.name)
+        if fmt not in importer.FORMATS:
+            return Response(
+                {'as': f'Допустимые значения: {", ".join(importer.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            report = importer.import_feed(request.user, upload, fmt)
+        except (csv.Error, ParseError, UnicodeDecodeError) as exc:
+            return Response({'file': f'Не удалось прочитать фид: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict())
+
+
 # ─── Заявки ───────────────────────────────────────────────
 class ApplicationListCreateView(generics.ListCreateAPIView):
     serializer_class = ApplicationSerializer
@@ -126,7 +512,13 @@ class ApplicationListCreateView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
-        serializer.save(user=user)
+
+        def save():
+            # Заявка и счётчик DailyStats — одной транзакцией, иначе повтор задвоит заявку
+            with transaction.atomic():
+                serializer.save(user=user)
+
+        retry_on_lock(save)
 
 
 class MyApplicationsView(generics.ListAPIView):
@@ -138,21 +530,50 @@ class MyApplicationsView(generics.ListAPIView):
 
 
 # ─── Статистика администратора ───────────────────────────
+ADMIN_STATS_TREND_DAYS = (30, 90)
+
+
+def collect_admin_stats(trend_days):
+    week_ago = timezone.now() - timedelta(days=7)
+    users = User.objects.aggregate(
+        total=Count('id'),
+        realtors=Count('id', filter=Q(role='realtor')),
+        admins=Count('id', filter=Q(role='admin')),
+    )
+    listings = Listing.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        inactive=Count('id', filter=Q(is_active=False)),
+    )
+    since = timezone.localdate() - timedelta(days=trend_days - 1)
+    trend = DailyStats.objects.filter(date__gte=since).order_by('date').values(
+        'date', 'listings_created', 'listings_deactivated', 'applications', 'likes'
+    )
+    return {
+        'users': users,
+        'listings': listings,
+        'applications_last_7_days': Application.objects.filter(created_at__gte=week_ago).count(),
+        'trend': list(trend),
+        'response_cache': response_cache.metrics(),
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def admin_stats(request):
-    week_ago = timezone.now() - timedelta(days=7)
-    data = {
-        'users': {
-            'total': User.objects.count(),
-            'realtors': User.objects.filter(role='realtor').count(),
-            'admins': User.objects.filter(role='admin').count(),
-        },
-        'listings': {
-            'total': Listing.objects.count(),
-            'active': Listing.objects.filter(is_active=True).count(),
-            'inactive': Listing.objects.filter(is_active=False).count(),
-        },
-        'applications_last_7_days': Application.objects.filter(created_at__gte=week_ago).count()
-    }
+    try:
+        trend_days = int(request.query_params.get('days', ADMIN_STATS_TREND_DAYS[0]))
+    except ValueError:
+        trend_days = None
+    if trend_days not in ADMIN_STATS_TREND_DAYS:
+        return Response(
+            {'days': f'Допустимые значения: {", ".join(map(str, ADMIN_STATS_TREND_DAYS))}'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    cache_key = f'admin_stats:{trend_days}'
+    data = cache.get(cache_key)
+    if data is None:
+        data = collect_admin_stats(trend_days)
+        cache.set(cache_key, data, settings.ADMIN_STATS_CACHE_TTL)
     return Response(data)
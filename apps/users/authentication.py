@@ -0,0 +1,37 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.instrumentation import span
+from .models import ClaimsUser, User
+from .tokens import ROLE_CLAIMS
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    Пользователь собирается из claims токена (ClaimsUser) без запроса к БД.
+    Токены без role/is_staff (выданные раньше) идут по старому пути — через БД.
+    Блокировка пользователя вступает в силу с истечением access-токена. Удалённый
+    пользователь получает 401: на чтении — при обращении к его полям, на записи
+    (она может сослаться на него как owner) — сразу, по проверке строки в БД.
+    """
+
+    def authenticate(self, request):
+        with span('auth'):
+            result = super().authenticate(request)
+            if result is not None and request.method not in permissions.SAFE_METHODS:
+                if not User.objects.filter(pk=result[0].pk).exists():
+                    raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            return result
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in ROLE_CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        return ClaimsUser.from_claims(pk, validated_token['role'], validated_token['is_staff'])
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -12,4 +14,37 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ['email', 'role']
 
     def __str__(self):
-        return f"{self.username} ({self.role})"
\ No newline at end of file
+        return f"{self.username} ({self.role})"
+
+
+class ClaimsUser(User):
+    """
+    Пользователь из claims access-токена: id, role и is_staff есть сразу, без БД.
+    Остальные поля подгружаются из кэша пользователей (user_cache) при первом
+    обращении. Это настоящий User: годится для owner=..., filter(user=...) и т.п.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, pk, role, is_staff):
+        values = {'id': pk, 'role': role, 'is_staff': is_staff}
+        # from_db ждёт значения в порядке полей модели
+        names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        return cls.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is None or from_queryset is not None or not deferred.issuperset(fields):
+            return super().refresh_from_db(using, fields, from_queryset)
+        from .user_cache import users
+
+        # Обращение к любому незагруженному полю подтягивает сразу все
+        try:
+            user = users.get(self.pk)
+        except User.DoesNotExist:
+            # Токен ещё действует, а пользователя удалили: 401, а не поля с null
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        for name in deferred:
+            setattr(self, name, getattr(user, name))
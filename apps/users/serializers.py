@@ -1,18 +1,25 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from core.instrumentation import TimedSerializerMixin
 from django.contrib.auth import get_user_model
 import random
 import string
 
+from .tokens import RoleRefreshToken, add_role_claims
+
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone', 'role']
         read_only_fields = ['id', 'role']
 
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class UserRegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, style={'input_type': 'password'})
     password2 = serializers.CharField(write_only=True, style={'input_type': 'password'})
     role = serializers.ReadOnlyField()
@@ -40,7 +47,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class ManagerCreationSerializer(serializers.ModelSerializer):
+class ManagerCreationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.SerializerMethodField()
 
     class Meta:
@@ -72,4 +79,24 @@ class ManagerCreationSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user.is_staff:
             return getattr(self, '_generated_password', None)
-        return None
\ No newline at end of file
+        return None
+
+
+# ───── Токены ─────
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        # Роль могла смениться после выдачи refresh-токена: claims берём из только что
+        # прочитанного пользователя, а не из кэша, — новый access их унаследует
+        add_role_claims(refresh, user)
+        return super().validate({**attrs, 'refresh': str(refresh)})
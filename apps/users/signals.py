@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ClaimsUser, User
+from .user_cache import users
+
+
+# ───── Кэш пользователей ─────
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=ClaimsUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    users.invalidate(instance.pk)
@@ -1,3 +1,98 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-# Create your tests here.
+from apps.listings.models import Listing
+from .models import ClaimsUser, User
+from .user_cache import users
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.realtor = User.objects.create_user(username='realtor', password='pass-12345', role='realtor')
+
+    def setUp(self):
+        users.clear()
+        self.client = APIClient()
+
+    def obtain(self):
+        response = self.client.post('/api/v1/users/auth/token/', {'username': 'realtor', 'password': 'pass-12345'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def authorize(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_carries_role(self):
+        access = AccessToken(self.obtain()['access'])
+        self.assertEqual((access['role'], access['is_staff']), ('realtor', False))
+
+    def test_permissions_without_user_query(self):
+        self.authorize(self.obtain()['access'])
+        # Только выборка заявок: пользователь собран из токена
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/v1/listings/applications/').status_code, 200)
+
+        response = self.client.post('/api/v1/listings/listings/', {
+            'title': 'Квартира', 'description': 'Описание', 'price': '50000', 'rooms': 2, 'area': '60',
+            'address': 'ул. Киевская, 1', 'deal_type': 'sale',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Listing.objects.get(pk=response.data['id']).owner_id, self.realtor.pk)
+
+    def test_full_user_from_cache_invalidated_on_save(self):
+        self.authorize(self.obtain()['access'])
+        self.assertEqual(self.client.get('/api/v1/users/me/').data['username'], 'realtor')
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/users/me/')
+
+        self.realtor.email = 'new@example.com'
+        self.realtor.save()
+        self.assertEqual(self.client.get('/api/v1/users/me/').data['email'], 'new@example.com')
+
+    def test_refresh_restamps_role(self):
+        refresh = self.obtain()['refresh']
+        User.objects.filter(pk=self.realtor.pk).update(role='admin', is_staff=True)
+        users.clear()
+        access = AccessToken(self.client.post('/api/v1/users/auth/token/refresh/', {'refresh': refresh}).data['access'])
+        self.assertEqual((access['role'], access['is_staff']), ('admin', True))
+
+    def test_refresh_ignores_cached_user(self):
+        tokens = self.obtain()
+        self.authorize(tokens['access'])
+        self.client.get('/api/v1/users/me/')
+        # update() не сбрасывает кэш пользователей — как правка в другом процессе
+        User.objects.filter(pk=self.realtor.pk).update(role='admin', is_staff=True)
+        response = self.client.post('/api/v1/users/auth/token/refresh/', {'refresh': tokens['refresh']})
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['role'], access['is_staff']), ('admin', True))
+
+    def test_refresh_for_deleted_user(self):
+        refresh = self.obtain()['refresh']
+        User.objects.filter(pk=self.realtor.pk).delete()
+        response = self.client.post('/api/v1/users/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_deleted_user_token_is_rejected(self):
+        self.authorize(self.obtain()['access'])
+        User.objects.filter(pk=self.realtor.pk).delete()
+        self.assertEqual(self.client.get('/api/v1/users/me/').status_code, 401)
+        response = self.client.post('/api/v1/listings/listings/', {
+            'title': 'Квартира', 'description': 'Описание', 'price': '50000', 'rooms': 2, 'area': '60',
+            'address': 'ул. Киевская, 1', 'deal_type': 'sale',
+        })
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Listing.objects.exists())
+
+    def test_token_without_claims_falls_back_to_database(self):
+        self.authorize(RefreshToken.for_user(self.realtor).access_token)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/v1/listings/applications/').status_code, 200)
+
+    def test_claims_user_field_order(self):
+        user = ClaimsUser.from_claims(self.realtor.pk, 'realtor', False)
+        self.assertEqual((user.pk, user.role, user.is_staff), (self.realtor.pk, 'realtor', False))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'realtor')
+            self.assertTrue(user.is_active)
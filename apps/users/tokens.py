@@ -0,0 +1,21 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+# ───── Токены с ролью ─────
+# role и is_staff лежат в самом токене: проверки прав (IsRealtor, IsAdminUser,
+# выдача для администратора) не читают пользователя из БД. Access-токен наследует
+# claims от refresh-токена.
+
+ROLE_CLAIMS = ('role', 'is_staff')
+
+
+def add_role_claims(token, user):
+    for claim in ROLE_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class RoleRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        return add_role_claims(super().for_user(user), user)
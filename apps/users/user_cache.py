@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+# ───── Кэш пользователей в памяти процесса ─────
+# Для вьюх, которым нужен весь User, а не только claims токена (/users/me/).
+# LRU на USER_CACHE_SIZE записей, каждая живёт USER_CACHE_TTL секунд. Сохранение
+# пользователя сбрасывает запись в своём процессе (signals.py), в остальных
+# устаревшие данные живут не дольше TTL.
+
+
+class UserCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Растёт при каждом сбросе: выборка, начатая до сброса, в кэш не попадёт
+        self.generation = 0
+
+    def get(self, pk):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(pk)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(pk)
+                return entry[0]
+            generation = self.generation
+
+        user = get_user_model().objects.get(pk=pk)
+        with self.lock:
+            if generation == self.generation:
+                self.entries[pk] = (user, now + settings.USER_CACHE_TTL)
+                self.entries.move_to_end(pk)
+                while len(self.entries) > settings.USER_CACHE_SIZE:
+                    self.entries.popitem(last=False)
+        return user
+
+    def invalidate(self, pk):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(pk, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+users = UserCache()
@@ -0,0 +1,127 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('request.timing')
+
+_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.statements = Counter()
+        self.spans = Counter()
+        self.active = set()
+        self.view_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: время и шаблон каждого запроса (параметры отдельно,
+        # так что одинаковые запросы с разными id дают один шаблон)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+@contextmanager
+def span(name):
+    """Замер участка запроса. Вложенный участок с тем же именем не считается дважды."""
+    metrics = _metrics.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+    metrics.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.spans[name] += time.perf_counter() - started
+        metrics.active.discard(name)
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with span('serialize'):
+            return super().to_representation(instance)
+
+
+class RequestTimingMiddleware:
+    """
+    Для доли запросов (REQUEST_TIMING_SAMPLE_RATE) считает SQL-запросы и время в БД,
+    сериализации и аутентификации. Итог уходит в заголовок Server-Timing и одной
+    JSON-строкой в лог request.timing; повторяющиеся запросы помечаются как N+1.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        finished = time.perf_counter()
+        total = finished - started
+        if metrics.view_started is not None:
+            # От входа во вьюху до возврата ответа во внешний middleware
+            metrics.spans['view'] = finished - metrics.view_started
+
+        duplicates = metrics.duplicates(settings.REQUEST_TIMING_DUPLICATE_THRESHOLD)
+        response['Server-Timing'] = self.server_timing(metrics, total, duplicates)
+        self.log(request, response, metrics, total, duplicates)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def server_timing(self, metrics, total, duplicates):
+        entries = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.db_queries} queries"']
+        entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in metrics.spans.items()]
+        if duplicates:
+            repeated = sum(count for _, count in duplicates)
+            entries.append(f'n-plus-one;desc="{repeated} repeated queries"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+    def log(self, request, response, metrics, total, duplicates):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'db_queries': metrics.db_queries,
+            'spans_ms': {name: round(seconds * 1000, 2) for name, seconds in metrics.spans.items()},
+            'duplicates': [{'sql': sql[:200], 'count': count} for sql, count in duplicates],
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
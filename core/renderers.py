@@ -0,0 +1,24 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # без orjson работает обычный JSONRenderer
+    orjson = None
+
+
+# ───── Быстрый JSON ─────
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson: тот же application/json, но сериализация в разы быстрее.
+    Типы, которых orjson не знает (Decimal, ленивые строки), отдаются кодировщику DRF.
+    С отступами (browsable API, ?indent) и без orjson — обычный путь DRF.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
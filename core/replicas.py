@@ -0,0 +1,93 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# ───── Чтение с реплик ─────
+# Реплику выбирает ReplicaMiddleware, и только для GET во вьюхи с replica_reads = True.
+# Всё остальное (записи, транзакции, прочие вьюхи, management-команды) идёт на primary.
+# После записи клиент на REPLICA_STICKY_SECONDS прилипает к primary, чтобы сразу
+# видеть свою правку, даже если реплика ещё отстаёт. Отметка хранится в кэше, поэтому
+# с репликами нужен общий для воркеров кэш (SHARED_CACHE): иначе GET на другом воркере
+# её не увидит.
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica = ContextVar('db_replica', default=None)
+
+
+def client_key(request):
+    """Клиент без обращения к БД: по токену, а без него — по IP (как у лайков)."""
+    identity = request.META.get('HTTP_AUTHORIZATION')
+    if not identity:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        identity = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR', '')
+    return f'db:sticky:{hashlib.sha1(identity.encode()).hexdigest()}'
+
+
+def pin_primary(request):
+    cache.set(client_key(request), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(request):
+    return cache.get(client_key(request)) is not None
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока — с primary, даже если запрос шёл на реплику."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        # Внутри транзакции читаем то, что в ней же и записали
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии primary: связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if settings.DATABASE_REPLICAS and not settings.SHARED_CACHE:
+            raise ImproperlyConfigured('Чтение с реплик требует общего кэша (REDIS_URL)')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_primary(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return
+        view = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if getattr(view, 'replica_reads', False) and not is_pinned(request):
+            # Одна реплика на весь запрос: страница и её prefetch видят один снимок
+            _replica.set(random.choice(settings.DATABASE_REPLICAS))
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestTimingMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -84,13 +89,84 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# WAL: читатели не ждут писателя; synchronous=NORMAL в WAL — fsync только на чекпоинтах.
+# BEGIN IMMEDIATE берёт блокировку записи в начале транзакции: иначе две транзакции,
+# начавшие с чтения, не могут обе перейти к записи и одна сразу получает
+# «database is locked», минуя timeout (busy_timeout).
+SQLITE_TUNED_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-65536;'
+        'PRAGMA temp_store=MEMORY'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
 }
 
+# Продакшен: POSTGRES_DB задан — primary POSTGRES_HOST и реплики POSTGRES_REPLICA_HOSTS
+# (через запятую, тот же порт и учётка). Без него — локальный SQLite.
+if os.environ.get('POSTGRES_DB'):
+    POSTGRES = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # Постоянные соединения: без подключения и авторизации на каждый запрос
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Перед повторным использованием соединение проверяется (рестарт, failover)
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5))},
+    }
+    DATABASES = {'default': {**POSTGRES, 'HOST': os.environ.get('POSTGRES_HOST', 'localhost')}}
+    replica_hosts = [host.strip() for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host.strip()]
+    for number, host in enumerate(replica_hosts, start=1):
+        DATABASES[f'replica{number}'] = {**POSTGRES, 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    # Однонодовые установки на SQLite: SQLITE_TUNED=1
+    if os.environ.get('SQLITE_TUNED'):
+        DATABASES['default']['OPTIONS'] = SQLITE_TUNED_OPTIONS
+
+# ───── Кэш ─────
+# В кэше живут поколения кэша ответов (apps/listings/response_cache.py), привязка
+# клиента к primary (core/replicas.py) и счётчики — они должны быть общими для всех
+# воркеров и management-команд (import_listings, decay_popularity, ...). LocMemCache
+# у каждого процесса свой: только для разработки в одном процессе (runserver).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED_CACHE = 'locmem' not in CACHES['default']['BACKEND']
+if os.environ.get('POSTGRES_DB') and not SHARED_CACHE:
+    raise ImproperlyConfigured('Для профиля Postgres нужен общий кэш: задайте REDIS_URL')
+
+# Чтение с реплик — см. core/replicas.py
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд после записи клиент читает только с primary
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# Кэш пользователей для запросов с JWT (apps/users/user_cache.py)
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60
+
+# Повторы записи при «database is locked» (core/sqlite.py): попыток и базовая пауза, с
+DB_LOCK_RETRIES = 4
+DB_LOCK_RETRY_DELAY = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +208,56 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Фоновая конвертация фото объявлений в WEBP (apps/listings/images.py)
+LISTING_IMAGE_ASYNC = True
+LISTING_IMAGE_WORKERS = 2
+LISTING_IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
+# Импорт фидов партнёров (apps/listings/importer.py): строк на один bulk_create/bulk_update,
+# потоков для скачивания фото и лимиты на каждую картинку
+LISTING_IMPORT_BATCH_SIZE = 500
+LISTING_IMPORT_IMAGE_WORKERS = 8
+LISTING_IMPORT_IMAGE_TIMEOUT = 10
+LISTING_IMPORT_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+# Server-Timing и лог request.timing (core/instrumentation.py): доля замеряемых
+# запросов и сколько одинаковых SQL за запрос считать N+1. В manage.py test выборка
+# выключена, чтобы заголовки и вывод не зависели от случая; тесты включают её сами
+REQUEST_TIMING_SAMPLE_RATE = 0 if sys.argv[1:2] == ['test'] else 0.1
+REQUEST_TIMING_DUPLICATE_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'request.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Сколько секунд кэшировать ответ /admin/stats/
+ADMIN_STATS_CACHE_TTL = 60
+
+# TTL кэша анонимной выдачи объявлений и локаций (apps/listings/response_cache.py).
+# Сохранения сбрасывают его сразу, а счётчик лайков может отставать не дольше TTL
+RESPONSE_CACHE_TTL = 60
+# /listings/batch/: сколько id можно запросить за раз
+LISTING_BATCH_MAX_IDS = 100
+# Популярность (apps/listings/popularity.py): вес события и период полураспада, ч
+POPULARITY_WEIGHTS = {'like': 1.0, 'application': 3.0}
+POPULARITY_HALF_LIFE_HOURS = 24
+# Сколько объявлений в ленте /listings/trending/
+TRENDING_SIZE = 20
+# Сколько похожих объявлений хранить на каждое (apps/listings/similar.py)
+SIMILAR_LISTINGS_COUNT = 10
+# Дерево локаций: ключ включает поколение «locations», так что в общем кэше можно
+# держать долго (с локальным кэшем — RESPONSE_CACHE_TTL)
+LOCATION_TREE_CACHE_TTL = 24 * 60 * 60
+# Как часто индекс автодополнения проверяет изменения из других процессов, с
+AUTOCOMPLETE_REFRESH_SECONDS = 5
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -140,8 +266,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.JWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -0,0 +1,31 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+# ───── Повтор записи при блокировке SQLite ─────
+# SQLite пускает одного писателя. Если timeout истёк (или блокировку нельзя ждать),
+# запрос падает с «database is locked» — короткая пауза и повтор транзакции целиком
+# обычно проходят. Внутри чужой транзакции не повторяем: она уже откатывается.
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return any(error in message for error in LOCK_ERRORS)
+
+
+def retry_on_lock(func, retries=None):
+    """Вызывает func (сама открывает transaction.atomic) с повторами при блокировке."""
+    retries = settings.DB_LOCK_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except OperationalError as exc:
+            if attempt == retries or not is_lock_error(exc) or transaction.get_connection().in_atomic_block:
+                raise
+        # Экспонента с разбросом: повторы параллельных запросов не совпадают
+        time.sleep(settings.DB_LOCK_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))